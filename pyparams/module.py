@@ -4,14 +4,68 @@ import os
 from pathlib import Path
 from typing import List, Any, Dict
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import pyparams.pyparam as pyparam
 from pyparams import pyparam_parser as parser
 from pyparams.pyparam_fn import IncludeModule
 
+# folders which are skipped when searching for the modules
+SKIP_DIRS = frozenset(
+    {".git", "__pycache__", "node_modules", "venv", ".venv", "build", "dist"}
+)
 
-@dataclass(frozen=True)
+# maps real path of the search folder to its index of python files
+_FILE_INDEX: Dict[str, Dict[str, Path]] = {}
+
+
+def get_file_index(base_path: Path) -> Dict[str, Path]:
+    """Returns an index of python files found in the `base_path` folder. Each
+    file is indexed by its relative path to `base_path` and to every
+    subfolder of the `base_path` e.g. file `base_path/a/b/c.py` can be
+    found with keys: `a/b/c.py`, `b/c.py` and `c.py`. The index is built
+    once per folder, use `clear_file_index` to rebuild it.
+
+    Args:
+        base_path: a search folder
+
+    Returns:
+        index: a dict which maps relative module path to the file path
+    """
+    key = os.path.realpath(str(base_path))
+    index = _FILE_INDEX.get(key)
+    if index is not None:
+        return index
+
+    index = {}
+    for root, dirs, files in os.walk(key):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        rel_root = os.path.relpath(root, key)
+        parts = [] if rel_root == "." else rel_root.split(os.sep)
+        for filename in sorted(files):
+            if not filename.endswith(".py"):
+                continue
+            path = Path(root) / filename
+            for i in range(len(parts) + 1):
+                index.setdefault("/".join(parts[i:] + [filename]), path)
+
+    _FILE_INDEX[key] = index
+    return index
+
+
+def clear_file_index() -> None:
+    """Removes all cached file indexes created by `get_file_index`"""
+    _FILE_INDEX.clear()
+
+
+def _clear_folders_file_index(folders: List[Path]) -> None:
+    """Removes cached file indexes of the folders, so they are rebuilt on the
+    next lookup"""
+    for folder in folders:
+        _FILE_INDEX.pop(os.path.realpath(str(folder)), None)
+
+
+@dataclass(frozen=True, **pyparam.DATACLASS_SLOTS_KWARGS)
 class PyParamModule(pyparam.NamedBasePyParam):
     """
     PyParamModule container.
@@ -24,6 +78,15 @@ class PyParamModule(pyparam.NamedBasePyParam):
 
     path: str
     scope: str = ""
+    _full_name: str = field(init=False, repr=False, compare=False)
+    _module_path: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # full_name and module_path are used as dict keys, so they are
+        # computed only once
+        full_name = f"{self.path}/{self.name}" if self.path else self.name
+        object.__setattr__(self, "_full_name", full_name)
+        object.__setattr__(self, "_module_path", self.path.replace(".", "/") + ".py")
 
     @staticmethod
     def from_ast_node(node: ast.AnnAssign) -> "PyParamModule":
@@ -40,7 +103,7 @@ class PyParamModule(pyparam.NamedBasePyParam):
 
     @property
     def full_name(self) -> str:
-        return os.path.join(self.path, self.name)
+        return self._full_name
 
     @property
     def value(self) -> str:
@@ -48,36 +111,59 @@ class PyParamModule(pyparam.NamedBasePyParam):
 
     @property
     def module_path(self) -> str:
-        return "/".join(self.path.split(".")) + ".py"
+        return self._module_path
 
     def module_source(self, base_path: Path) -> str:
-        for folder in base_path.rglob("*"):
-            path = folder.parent / Path(self.module_path)
-            if path.exists():
-                return parser.read_source_code(path)
+        path = get_file_index(base_path).get(self.module_path)
+        if path is None or not path.is_file():
+            # the index may be outdated, files could be added or removed
+            _clear_folders_file_index([base_path])
+            path = get_file_index(base_path).get(self.module_path)
 
-        raise FileNotFoundError(
-            f"Cannot find module: {self.module_path}, search path: {base_path}")
+        if path is None:
+            raise FileNotFoundError(
+                f"Cannot find module: {self.module_path}, search path: {base_path}")
 
-    def find_module_source(self, search_folders: List[Path]) -> str:
-        sources = []
-        for search_folder in search_folders:
-            try:
-                source = self.module_source(search_folder)
-                sources.append((search_folder, source))
-            except ValueError:
-                pass
+        return parser.read_source_code(path)
+
+    def find_module_path(self, search_folders: List[Path]) -> Path:
+        """Finds the module file in the search folders. The module must be
+        present in exactly one of the search folders.
+
+        Args:
+            search_folders: a list of folders in which module can be found
+
+        Returns:
+            path: a path to the module file
+        """
+        paths = self._find_module_paths(search_folders)
+        if len(paths) == 0 or not all(path.is_file() for path in paths):
+            # the indexes may be outdated, files could be added or removed
+            _clear_folders_file_index(search_folders)
+            paths = self._find_module_paths(search_folders)
 
-        if len(sources) == 0:
+        if len(paths) == 0:
             folders = [str(folder) for folder in search_folders]
             raise FileNotFoundError(
                 f"Cannot find module: {self.module_path} in search paths: {folders}"
             )
-        elif len(sources) > 1:
+        elif len(paths) > 1:
             raise ValueError(
                 f"Found more than one modules with path {self.module_path}"
             )
-        return sources[0][1]
+        return paths[0]
+
+    def _find_module_paths(self, search_folders: List[Path]) -> List[Path]:
+        """Returns paths to the module file found in the search folders"""
+        paths = []
+        for search_folder in search_folders:
+            path = get_file_index(search_folder).get(self.module_path)
+            if path is not None:
+                paths.append(path)
+        return paths
+
+    def find_module_source(self, search_folders: List[Path]) -> str:
+        return parser.read_source_code(self.find_module_path(search_folders))
 
     def to_dict(self) -> Dict[str, Any]:
         raise NotImplementedError("to_dict is not implemented ...")
@@ -99,22 +185,20 @@ class PyParamModule(pyparam.NamedBasePyParam):
         Returns:
             same source code encapsulated by class statement.
         """
-        source_code_module = ast.parse(source=module_source)
+        source_code_module = parser.parse_source_code(module_source)
         nodes = parser.find_function_def_nodes(source_code_module)
-        defined_functions = [node.name for node in nodes]
 
-        lines = module_source.split("\n")
         IND = parser.COMPILED_SOURCE_INDENTATION
-        new_lines = [f"class {self.value}:", f"{IND}def __init__(self):"]
-        for line in lines:
-            new_lines.append(f"{IND}{IND}{line}")
-
-        for func_name in defined_functions:
-            # for simplicity generate assignments only for public functions
-            if not func_name.startswith("_"):
-                new_lines.append(f"{IND}{IND}self.{func_name} = {func_name}")
-
-        return "\n".join(new_lines)
+        body_indent = IND * 2
+        header = f"class {self.value}:\n{IND}def __init__(self):\n"
+        body = body_indent + module_source.replace("\n", "\n" + body_indent)
+        # for simplicity generate assignments only for public functions
+        assignments = "".join(
+            f"\n{body_indent}self.{node.name} = {node.name}"
+            for node in nodes
+            if not node.name.startswith("_")
+        )
+        return header + body + assignments
 
     def render_as_ast_node(self, lineno: int, col_offset: int) -> ast.AST:
         """
@@ -127,11 +211,16 @@ class PyParamModule(pyparam.NamedBasePyParam):
             col_offset: column offset in that line
 
         Returns:
-            node: an AST node as `IncludeModule(path, scope)`
+            node: an ast.Call node as `IncludeModule(path=path, scope=scope)`
         """
-
-        value = f"{IncludeModule.__name__}(path='{self.path}', scope='{self.scope}')"
-        node = ast.Module(body=value)
+        node = ast.Call(
+            func=ast.Name(id=IncludeModule.__name__, ctx=ast.Load()),
+            args=[],
+            keywords=[
+                ast.keyword(arg="path", value=pyparam.value_to_ast_node(self.path, str)),
+                ast.keyword(arg="scope", value=pyparam.value_to_ast_node(self.scope, str)),
+            ],
+        )
         node.lineno = lineno
         node.col_offset = col_offset
-        return node
+        return ast.fix_missing_locations(node)
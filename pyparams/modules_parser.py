@@ -1,22 +1,28 @@
 """Importing python functions/modules"""
 import ast
+import io
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List
-
-import astor
+from typing import Callable, Dict, List, Optional, Tuple
 
 import pyparams.pyparam as pyparam
 import pyparams.pyparam_fn as pyparam_fn
 from pyparams import pyparam_parser
-from pyparams.module import PyParamModule
+from pyparams.module import PyParamModule, clear_file_index
 from pyparams.pyparam_fn import (
     IncludeModule,
     DeriveModule,
     ReplaceModule,
     IncludeSource,
 )
-from pyparams.utils import REMatcher
+
+_RE_FROM_IMPORT = re.compile(r"([ ]*)from (.*).*import.*[*].*")
+_RE_IMPORT_AS = re.compile(r"([ ]*)import (.*)[ ]*as[ ]*(.*)[ ]*")
+_RE_IMPORT_MODULE_DECORATOR = re.compile(
+    fr".*{re.escape(pyparam_fn.IMPORT_MODULE_DECORATOR)}.*\((.*)\).*"
+)
+_RE_INCLUDE_SOURCE_CALL = re.compile(fr"\b{IncludeSource.__name__}\s*\(")
 
 
 def update_modules_pyparams(source_code: str, new_includes: List[PyParamModule]) -> str:
@@ -30,38 +36,61 @@ def update_modules_pyparams(source_code: str, new_includes: List[PyParamModule])
     Returns:
         new source code with pyparams parameters adapted from new_params list
     """
-    includes = pyparam_parser.get_all_pyparams_from_source_code(
-        source_code, assigment_op_name=IncludeModule.__name__, ast_parser=PyParamModule
-    )
-    named_nodes, source_code_module = pyparam_parser.get_source_params_assignments(
+    (
+        includes,
+        named_nodes,
+        source_code_module,
+    ) = pyparam_parser.get_source_params_with_assignments(
         source_code, assigment_op_name=IncludeModule.__name__, ast_parser=PyParamModule
     )
 
-    node_to_config_param = {}
+    _replace_include_nodes(named_nodes, includes, new_includes)
+    return pyparam_parser.render_module(source_code_module)
+
+
+def _replace_include_nodes(
+    named_nodes: Dict[str, ast.AnnAssign],
+    includes: List[PyParamModule],
+    new_includes: List[PyParamModule],
+) -> None:
+    """Replace values of the IncludeModule nodes with the new includes. Nodes
+    to be replaced are known, so they are modified in place instead of
+    visiting the whole tree with ast.NodeTransformer.
+
+    Args:
+        named_nodes: a dictionary with {include.full_name: AnnAssign}
+        includes: a list of PyParamModule found in the source code
+        new_includes: a list of PyParamModule with new values
+    """
     for include, new_include in zip(includes, new_includes):
-        node_to_config_param[named_nodes[include.full_name]] = new_include
-
-    # transforming nodes with values from config
-    class ASTTransformer(ast.NodeTransformer):
-        def visit_AnnAssign(self, node: ast.AnnAssign) -> ast.AST:
-            """
-            For nodes: replace with static value
-            """
-            if node in node_to_config_param:
-                node.value = node_to_config_param[node].render_as_ast_node(
-                    lineno=node.value.lineno, col_offset=node.value.col_offset
-                )
-                return node
-            else:
-                return node
-
-    new_root_module = ASTTransformer().visit(source_code_module)
-    new_source = astor.to_source(
-        new_root_module,
-        indent_with=pyparam_parser.COMPILED_SOURCE_INDENTATION,
-        pretty_source=pyparam_parser.astor_pretty_source_formatter,
-    )
-    return new_source
+        node = named_nodes[include.full_name]
+        node.value = new_include.render_as_ast_node(
+            lineno=node.value.lineno, col_offset=node.value.col_offset
+        )
+
+
+def _find_call_arguments_starts(source_code: str, function_name: str) -> List[int]:
+    """Finds calls of the function in the source code, spaces between the
+    function name and the bracket are allowed e.g. `DeriveModule ("path")`
+
+    Args:
+        source_code: a source code to scan
+        function_name: a name of the called function
+
+    Returns:
+        a list of positions right after the opening bracket of each call
+    """
+    starts = []
+    index = source_code.find(function_name)
+    while index != -1:
+        end = index + len(function_name)
+        previous_char = source_code[index - 1] if index > 0 else ""
+        if not (previous_char.isalnum() or previous_char == "_"):
+            arguments = source_code[end:].lstrip()
+            if arguments.startswith("("):
+                starts.append(len(source_code) - len(arguments) + 1)
+        index = source_code.find(function_name, end)
+    return starts
 
 
 def derive_module(source_code: str, search_folders: List[Path]) -> str:
@@ -77,17 +106,25 @@ def derive_module(source_code: str, search_folders: List[Path]) -> str:
         a new source code which includes the source of the derived module
     """
 
-    if DeriveModule.__name__ not in source_code:
+    derive_calls = _find_call_arguments_starts(source_code, DeriveModule.__name__)
+    if len(derive_calls) == 0:
         return source_code
 
-    if re.split("[()\\s]+", source_code).count(DeriveModule.__name__) != 1:
+    if len(derive_calls) != 1:
         raise ValueError("DeriveModule can be used only once in the code")
 
+    start = derive_calls[0]
+    end = source_code.find(")", start)
     derive_module_name = None
-    for line in source_code.split("\n"):
-        matcher = REMatcher(line)
-        if matcher.match(fr'.*{DeriveModule.__name__}.*\([ "]+(.*)[ "]+\).*'):
-            derive_module_name = matcher.group(1)
+    if end != -1:
+        # handle DeriveModule("path"), DeriveModule('path') and
+        # DeriveModule(path="path"), the module path may contain "="
+        derive_module_arg = source_code[start:end].strip()
+        if derive_module_arg.startswith("path"):
+            keyword_value = derive_module_arg[len("path"):].lstrip()
+            if keyword_value.startswith("="):
+                derive_module_arg = keyword_value[1:]
+        derive_module_name = derive_module_arg.strip().strip("\"'").strip() or None
 
     if derive_module_name is None:
         raise ValueError(
@@ -108,7 +145,11 @@ def derive_module(source_code: str, search_folders: List[Path]) -> str:
         source_code=new_source, search_folders=search_folders
     )
 
-    parsed_modules_list = pyparam_parser.get_all_pyparams_from_source_code(
+    (
+        parsed_modules_list,
+        named_nodes,
+        new_source_module,
+    ) = pyparam_parser.get_source_params_with_assignments(
         new_source, assigment_op_name=IncludeModule.__name__, ast_parser=PyParamModule
     )
 
@@ -123,8 +164,21 @@ def derive_module(source_code: str, search_folders: List[Path]) -> str:
                 break
         modules_list.append(module)
 
-    new_source = update_modules_pyparams(new_source, modules_list)
-    return new_source
+    _replace_include_nodes(named_nodes, parsed_modules_list, modules_list)
+    return pyparam_parser.render_module(new_source_module)
+
+
+@lru_cache(maxsize=None)
+def _include_separator_lines(col_offset: int) -> Tuple[str, str]:
+    """Returns (open_line, close_line) of the comment block which surrounds
+    included source code. Lines depend only on the col_offset, so they are
+    built once per offset.
+    """
+    s_col_offset = " " * col_offset
+    dashes = "-" * (80 - col_offset)
+    open_line = f'{s_col_offset}"""\n{s_col_offset}{dashes}'
+    close_line = f'{s_col_offset}{dashes}\n{s_col_offset}"""'
+    return open_line, close_line
 
 
 def render_include_source_code(
@@ -143,29 +197,24 @@ def render_include_source_code(
     """
     print(f"PyParams: including module source: {include_path}")
     s_col_offset = " " * col_offset
+    open_line, close_line = _include_separator_lines(col_offset)
 
     comment_line = f"{s_col_offset}PyParams: auto include source of `{include_path}`"
-    header_lines = [
-        f'{s_col_offset}"""\n{s_col_offset}' + "-" * (80 - col_offset),
-        f"{s_col_offset}{comment_line}",
-        s_col_offset + "-" * (80 - col_offset) + f'\n{s_col_offset}"""',
-    ]
+    include_lines = [open_line, f"{s_col_offset}{comment_line}", close_line]
 
-    include_lines = header_lines + [s_col_offset + l for l in include_code.split("\n")]
+    # every line is indented, including the empty ones
+    indented_code = s_col_offset + include_code.replace("\n", "\n" + s_col_offset)
+    include_lines += indented_code.split("\n")
 
     comment_line = f"{s_col_offset}INCLUDE END OF `{include_path}`"
-    include_lines += [
-        f'{s_col_offset}"""\n{s_col_offset}' + "-" * (80 - col_offset),
-        f"{s_col_offset}{comment_line}",
-        s_col_offset + "-" * (80 - col_offset) + f'\n{s_col_offset}"""',
-    ]
+    include_lines += [open_line, f"{s_col_offset}{comment_line}", close_line]
 
     return include_lines
 
 
 def include_source_from_nodes(source_code: str, search_folders: List[Path]) -> str:
-    """Recursively scan a source code for PyParams include and import
-    declarations and include the source found modules
+    """Scan a source code for PyParams include and import declarations and
+    include the source found modules. Included sources are scanned recursively.
 
     Args:
         source_code: a source code to be parsed
@@ -178,42 +227,130 @@ def include_source_from_nodes(source_code: str, search_folders: List[Path]) -> s
     source_code = parse_include_source_decorators(source_code)
     source_code = parse_include_modules_decorators(source_code)
 
-    if IncludeSource.__name__ not in source_code:
+    # the name alone can be found e.g. in imports, parse only sources which
+    # may contain IncludeSource call
+    if not _RE_INCLUDE_SOURCE_CALL.search(source_code):
         return source_code
 
     expr_nodes = pyparam_parser.find_ast_expr_nodes(
-        ast.parse(source=source_code), IncludeSource.__name__
+        pyparam_parser.parse_source_code(source_code), IncludeSource.__name__
     )
 
-    if len(expr_nodes) > 0:
-        node = expr_nodes[0]
-        expr_data = pyparam.ast_node_to_value(node.value)
-        if expr_data["args"]:
-            include_path = expr_data["args"][0]
+    if len(expr_nodes) == 0:
+        return source_code
+
+    new_source_code = io.StringIO()
+    # offset of the first not copied character of the source_code
+    copied_offset = 0
+    # line number and offset of the start of that line in the source_code
+    lineno, line_offset = 1, 0
+    for node in sorted(expr_nodes, key=lambda expr_node: expr_node.lineno):
+        # only the path argument is needed, the rest of the call is not converted
+        call = node.value
+        if call.args:
+            include_path = pyparam.ast_node_to_value(call.args[0])
         else:
-            include_path = expr_data["keywords"][0][1]
+            include_path = pyparam.ast_node_to_value(call.keywords[0].value)
 
         include_code = PyParamModule("derived", include_path).find_module_source(
             search_folders
         )
+        include_code = include_source_from_nodes(include_code, search_folders)
 
         include_lines = render_include_source_code(
             node.col_offset, include_path, include_code
         )
 
-        source_code_lines = source_code.split("\n")
-        for lineno, line in enumerate(source_code_lines):
-            if IncludeSource.__name__ in line and include_path in line:
-                break
+        while lineno < node.lineno:
+            line_offset = source_code.find("\n", line_offset) + 1
+            lineno += 1
 
-        new_source_code_lines = (
-            source_code_lines[:lineno] + include_lines + source_code_lines[lineno + 1 :]
-        )
+        line_end = source_code.find("\n", line_offset)
+        if line_end == -1:
+            line_end = len(source_code)
+
+        new_source_code.write(source_code[copied_offset:line_offset])
+        new_source_code.write("\n".join(include_lines))
+        copied_offset = line_end
+
+    new_source_code.write(source_code[copied_offset:])
+    return new_source_code.getvalue()
+
+
+def _split_line_ending(line: str) -> Tuple[str, str]:
+    """Splits line read from io.StringIO into its content and line ending"""
+    if line.endswith("\n"):
+        return line[:-1], "\n"
+    return line, ""
 
-        source_code = "\n".join(new_source_code_lines)
-        source_code = include_source_from_nodes(source_code, search_folders)
 
-    return source_code
+def _replace_single_decorated_line(
+    source_code: str,
+    decorator: str,
+    render_line: Callable[[str, str], str],
+) -> Optional[str]:
+    """A fast path for the source code which contains a single decorator. Only
+    the decorator and the decorated line are rewritten, without splitting
+    the whole source code into lines.
+
+    Args:
+        source_code: input source code
+        decorator: a decorator to look for e.g. IMPORT_SOURCE_DECORATOR
+        render_line: a function (line, decorator_def) -> new_line which renders
+            the decorated line
+
+    Returns:
+        new source code or None when the source contains more than one
+        decorator or when decorator is in the last line of the source code
+    """
+    if source_code.count(decorator) != 1:
+        return None
+
+    index = source_code.find(decorator)
+    decorator_start = source_code.rfind("\n", 0, index) + 1
+    decorator_end = source_code.find("\n", index)
+    if decorator_end == -1:
+        return None
+
+    line_end = source_code.find("\n", decorator_end + 1)
+    if line_end == -1:
+        line_end = len(source_code)
+
+    decorator_def = source_code[decorator_start:decorator_end]
+    line = source_code[decorator_end + 1 : line_end]
+    new_line = render_line(line, decorator_def)
+    return source_code[:decorator_start] + new_line + source_code[line_end:]
+
+
+def _render_include_source_line(line: str) -> str:
+    """Converts line decorated with IMPORT_SOURCE_DECORATOR to IncludeSource"""
+    print(f"PyParams: Found include source decorator: {line}")
+    matcher = _RE_FROM_IMPORT.match(line)
+    if not matcher:
+        raise ValueError(f"Cannot parse include source line: {line}")
+
+    col_offset = matcher.group(1)
+    include_source_path = matcher.group(2).strip()
+    return f"{col_offset}{IncludeSource.__name__}('{include_source_path}')"
+
+
+def _render_include_module_line(line: str, decorator_def: str) -> str:
+    """Converts line decorated with IMPORT_MODULE_DECORATOR to IncludeModule"""
+    print(f"PyParams: Found include module decorator: {line}")
+    matcher = _RE_IMPORT_AS.match(line)
+    deco_matcher = _RE_IMPORT_MODULE_DECORATOR.match(decorator_def)
+    if not (matcher and deco_matcher):
+        raise ValueError(
+            f"Cannot parse include module line: {line} with decorator def: {decorator_def}"
+        )
+
+    dec_scope_arg = deco_matcher.group(1).strip()
+    col_offset = matcher.group(1)
+    include_source_path = matcher.group(2).strip()
+    module_name = matcher.group(3).strip()
+    if dec_scope_arg == "":
+        dec_scope_arg = '""'
+    return f"{col_offset}{module_name}: Module = {IncludeModule.__name__}('{include_source_path}', scope={dec_scope_arg})"
 
 
 def parse_include_source_decorators(source_code: str) -> str:
@@ -227,34 +364,34 @@ def parse_include_source_decorators(source_code: str) -> str:
     Returns:
         new source code with included modules
     """
-    if pyparam_fn.IMPORT_SOURCE_DECORATOR not in source_code:
+    decorator = pyparam_fn.IMPORT_SOURCE_DECORATOR
+    if decorator not in source_code:
         return source_code
 
-    source_code_lines = source_code.split("\n")
+    new_source_code = _replace_single_decorated_line(
+        source_code,
+        decorator,
+        lambda line, decorator_def: _render_include_source_line(line),
+    )
+    if new_source_code is not None:
+        return new_source_code
+
+    new_source_code = io.StringIO()
     has_import_source = False
-    new_lines = []
-    for line in source_code_lines:
+    for line in io.StringIO(source_code):
+        line, eol = _split_line_ending(line)
 
         if has_import_source:
-            print(f"PyParams: Found include source decorator: {line}")
             has_import_source = False
+            line = _render_include_source_line(line)
 
-            matcher = REMatcher(line)
-            if matcher.match(r"([ ]*)from (.*).*import.*[*].*"):
-
-                col_offset = matcher.group(1)
-                include_source_path = matcher.group(2).strip()
-                line = f"{col_offset}{IncludeSource.__name__}('{include_source_path}')"
-            else:
-                raise ValueError(f"Cannot parse include source line: {line}")
-
-        if pyparam_fn.IMPORT_SOURCE_DECORATOR in line:
+        if decorator in line:
             has_import_source = True
             continue
 
-        new_lines.append(line)
+        new_source_code.write(line + eol)
 
-    return "\n".join(new_lines)
+    return new_source_code.getvalue()
 
 
 def parse_include_modules_decorators(source_code: str) -> str:
@@ -268,45 +405,32 @@ def parse_include_modules_decorators(source_code: str) -> str:
     Returns:
         new source code with included modules
     """
-    if pyparam_fn.IMPORT_MODULE_DECORATOR not in source_code:
+    decorator = pyparam_fn.IMPORT_MODULE_DECORATOR
+    if decorator not in source_code:
         return source_code
 
-    source_code_lines = source_code.split("\n")
+    new_source_code = _replace_single_decorated_line(
+        source_code, decorator, _render_include_module_line
+    )
+    if new_source_code is not None:
+        return new_source_code
+
+    new_source_code = io.StringIO()
     decorator_def = None
-    new_lines = []
-    for line in source_code_lines:
+    for line in io.StringIO(source_code):
+        line, eol = _split_line_ending(line)
 
         if decorator_def:
-            print(f"PyParams: Found include module decorator: {line}")
-            matcher = REMatcher(line)
-            deco_matcher = REMatcher(decorator_def)
-            has_deco_match = deco_matcher.match(
-                fr".*{pyparam_fn.IMPORT_MODULE_DECORATOR}.*\((.*)\).*"
-            )
-            if matcher.match(r"([ ]*)import (.*)[ ]*as[ ]*(.*)[ ]*") and has_deco_match:
-
-                dec_scope_arg = deco_matcher.group(1).strip()
-                col_offset = matcher.group(1)
-                include_source_path = matcher.group(2).strip()
-                module_name = matcher.group(3).strip()
-                if dec_scope_arg == "":
-                    dec_scope_arg = '""'
-                line = f"{col_offset}{module_name}: Module = {IncludeModule.__name__}('{include_source_path}', scope={dec_scope_arg})"
-
-            else:
-                raise ValueError(
-                    f"Cannot parse include module line: {line} with decorator def: {decorator_def}"
-                )
-
+            line = _render_include_module_line(line, decorator_def)
             decorator_def = None
 
-        if pyparam_fn.IMPORT_MODULE_DECORATOR in line:
+        if decorator in line:
             decorator_def = line
             continue
 
-        new_lines.append(line)
+        new_source_code.write(line + eol)
 
-    return "\n".join(new_lines)
+    return new_source_code.getvalue()
 
 
 def include_modules(source_code: str, search_folders: List[Path]) -> str:
@@ -321,6 +445,7 @@ def include_modules(source_code: str, search_folders: List[Path]) -> str:
     Returns:
         a new source code which will contain all imported modules.
     """
+    clear_file_index()
     source_code = derive_module(source_code=source_code, search_folders=search_folders)
     source_code = "from pyparams import Module\n" + source_code
     source_code = include_source_from_nodes(
@@ -334,11 +459,21 @@ def include_modules(source_code: str, search_folders: List[Path]) -> str:
     if len(modules_list) == 0:
         return source_code
 
+    # resolve all modules before processing them, each file is read once even
+    # if module is imported multiple times
+    modules_paths = [
+        module_param.find_module_path(search_folders=search_folders)
+        for module_param in modules_list
+    ]
+    modules_sources = {
+        path: pyparam_parser.read_source_code(path) for path in set(modules_paths)
+    }
+
     imported_modules = ""
-    for module_param in modules_list:
+    for module_param, module_path in zip(modules_list, modules_paths):
         module_param: PyParamModule
 
-        source = module_param.find_module_source(search_folders=search_folders)
+        source = modules_sources[module_path]
 
         if module_param.scope != "":
             pyparams = pyparam_parser.get_all_pyparams_from_source_code(source)
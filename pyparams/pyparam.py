@@ -1,5 +1,5 @@
 import ast
-import os
+import sys
 from abc import abstractmethod
 from typing import Any, Optional, Dict, Union
 
@@ -19,6 +19,72 @@ _str_to_dtype = {
 
 _dtype_to_str = {v: k for k, v in _str_to_dtype.items()}
 
+# dataclasses can generate __slots__ since python 3.10, for older versions
+# instances keep their __dict__
+DATACLASS_SLOTS_KWARGS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def _constant_to_value(node: ast.Constant) -> Any:
+    if type(node.value) not in _CONSTANT_TYPES:
+        raise ValueError(
+            f"Cannot parse AST constant of type: {type(node.value)}. "
+            f"Node parameters: {node.__dict__}"
+        )
+    return node.value
+
+
+def _attribute_to_value(node: ast.Attribute) -> str:
+    # walk the chain of attributes e.g. `a.b.c` iteratively
+    attrs = []
+    while isinstance(node, ast.Attribute):
+        attrs.append(node.attr)
+        node = node.value
+    attrs.append(ast_node_to_value(node))
+    return ".".join(reversed(attrs))
+
+
+def _call_to_value(node: ast.Call) -> Dict[str, Any]:
+    return {
+        "name": ast_node_to_value(node.func),
+        "args": [ast_node_to_value(arg) for arg in node.args],
+        "keywords": [ast_node_to_value(arg) for arg in node.keywords],
+    }
+
+
+def _dict_to_value(node: ast.Dict) -> Dict[Any, Any]:
+    to_value = ast_node_to_value
+    return {to_value(key): to_value(value) for key, value in zip(node.keys, node.values)}
+
+
+# constant values which can be read from the ast.Constant node
+_CONSTANT_TYPES = frozenset({int, float, complex, str, bool, type(None)})
+
+# maps type of the AST node to the function which extracts its value, the
+# exact type of the node is looked up first, so most of the nodes are handled
+# without a chain of isinstance checks
+_AST_NODE_TO_VALUE = {
+    ast.Name: lambda node: node.id,
+    ast.Constant: _constant_to_value,
+    ast.Tuple: lambda node: (*map(ast_node_to_value, node.elts),),
+    ast.List: lambda node: [ast_node_to_value(e) for e in node.elts],
+    ast.Attribute: _attribute_to_value,
+    ast.Subscript: lambda node: ast_node_to_value(node.value),
+    str: lambda node: node,
+    ast.keyword: lambda node: (ast_node_to_value(node.arg), ast_node_to_value(node.value)),
+    ast.Call: _call_to_value,
+    ast.Dict: _dict_to_value,
+}
+
+if sys.version_info < (3, 8):
+    # older python versions parse constants to separate node types
+    _AST_NODE_TO_VALUE.update(
+        {
+            ast.Num: lambda node: node.n,
+            ast.Str: lambda node: node.s,
+            ast.NameConstant: lambda node: node.value,
+        }
+    )
+
 
 def ast_node_to_value(node: ast.AST) -> Any:
     """
@@ -37,46 +103,55 @@ def ast_node_to_value(node: ast.AST) -> Any:
     Raises:
         ValueError: when the type of the node is not supported
     """
-    if isinstance(node, ast.Name):
-        return node.id
-    elif isinstance(node, ast.Num):
-        return node.n
-    elif isinstance(node, ast.Str):
-        return node.s
-    elif isinstance(node, ast.Tuple):
-        return [ast_node_to_value(e) for e in node.elts]
-    elif isinstance(node, ast.List):
-        return [ast_node_to_value(e) for e in node.elts]
-    elif isinstance(node, ast.NameConstant):
-        return node.value
-    elif isinstance(node, ast.Attribute):
-        if isinstance(node, ast.Attribute):
-            return ast_node_to_value(node.value) + "." + node.attr
-        else:
-            return node.value.id + "." + node.attr
-    elif isinstance(node, ast.Subscript):
-        return ast_node_to_value(node.value)
-    elif isinstance(node, str):
-        return node
-    elif isinstance(node, ast.keyword):
-        return ast_node_to_value(node.arg), ast_node_to_value(node.value)
-    elif isinstance(node, ast.Call):
-        data = {
-            "name": ast_node_to_value(node.func),
-            "args": [ast_node_to_value(arg) for arg in node.args],
-            "keywords": [ast_node_to_value(arg) for arg in node.keywords],
-        }
-        return data
-    elif isinstance(node, ast.Dict):
-        return {
-            ast_node_to_value(key): ast_node_to_value(value)
-            for key, value in zip(node.keys, node.values)
-        }
-    else:
-        raise ValueError(
-            f"Cannot parse AST node of type: {type(node)}. "
-            f"Node parameters: {node.__dict__}"
-        )
+    to_value = _AST_NODE_TO_VALUE.get(type(node))
+    if to_value is not None:
+        return to_value(node)
+
+    # subclasses of the supported nodes
+    for node_type, to_value in _AST_NODE_TO_VALUE.items():
+        if isinstance(node, node_type):
+            return to_value(node)
+
+    raise ValueError(
+        f"Cannot parse AST node of type: {type(node)}. "
+        f"Node parameters: {getattr(node, '__dict__', node)}"
+    )
+
+
+if sys.version_info >= (3, 8):
+    _constant_node = ast.Constant
+else:
+    # older python versions (and astor used to render them) expect separate
+    # node types for constants
+    def _constant_node(value: Any) -> ast.AST:
+        if value is None or isinstance(value, bool):
+            return ast.NameConstant(value)
+        if isinstance(value, str):
+            return ast.Str(value)
+        return ast.Num(value)
+
+
+def _dict_to_ast_node(value: Dict[Any, Any]) -> ast.Dict:
+    keys, values = [], []
+    for key, val in value.items():
+        keys.append(value_to_ast_node(key, type(key)))
+        values.append(value_to_ast_node(val, type(val)))
+    return ast.Dict(keys=keys, values=values)
+
+
+# maps dtype of the value to the function which creates its AST node
+_VALUE_TO_AST_NODE = {
+    int: _constant_node,
+    float: _constant_node,
+    bool: _constant_node,
+    str: _constant_node,
+    list: lambda value: ast.List(elts=[value_to_ast_node(e, type(e)) for e in value]),
+    tuple: lambda value: ast.Tuple(elts=[value_to_ast_node(e, type(e)) for e in value]),
+    dict: _dict_to_ast_node,
+    set: lambda value: ast.Set(elts=[value_to_ast_node(e, type(e)) for e in value]),
+    # value is a python expression e.g. a name of the object
+    type: lambda value: ast.parse(value, mode="eval").body,
+}
 
 
 def value_to_ast_node(value: Any, dtype: type) -> ast.AST:
@@ -84,7 +159,7 @@ def value_to_ast_node(value: Any, dtype: type) -> ast.AST:
     some value (str, int, or nested structures of dicts list etc) and return
     corresponding AST node.
 
-    For example: value=5, dtype=int, this function will return: ast.Num(value)
+    For example: value=5, dtype=int, this function will return: ast.Constant(value)
 
     Args:
         value: a python variable like: 4, 'text', {'s': 5, 't': [1, 2]}
@@ -98,29 +173,16 @@ def value_to_ast_node(value: Any, dtype: type) -> ast.AST:
         ValueError: when the dtype of is not supported
     """
     if value is None:
-        return ast.Module(body=str(value))
-    elif dtype in [int, float]:
-        return ast.Num(value)
-    elif dtype == bool:
-        return ast.NameConstant(value)
-    elif dtype == str:
-        return ast.Str(value)
-    elif dtype == list:
-        return ast.List(elts=[value_to_ast_node(e, type(e)) for e in value])
-    elif dtype == tuple:
-        return ast.Tuple(elts=[value_to_ast_node(e, type(e)) for e in value])
-    elif dtype == dict:
-        return ast.Dict(
-            keys=[value_to_ast_node(key, type(key)) for key in value.keys()],
-            values=[value_to_ast_node(val, type(val)) for val in value.values()],
-        )
-    elif dtype == type:
-        return ast.Module(body=value)
-    else:
+        return _constant_node(None)
+
+    to_ast_node = _VALUE_TO_AST_NODE.get(dtype)
+    if to_ast_node is None:
         raise ValueError(f"Cannot parse value: {value} with dtype: {dtype} to ast Node")
+    return to_ast_node(value)
 
 
 class BasePyParam:
+    __slots__ = ()
 
     def to_ast_node(self, lineno: int, col_offset: int) -> ast.AST:
         """
@@ -137,8 +199,9 @@ class BasePyParam:
         node.col_offset = col_offset
         return node
 
+    # static methods are not marked with @abstractmethod, it cannot be applied
+    # when the module is compiled with Cython (see setup.py)
     @staticmethod
-    @abstractmethod
     def from_ast_node(node: ast.AnnAssign) -> "BasePyParam":
         """Converts AST node to PyParam object
 
@@ -164,7 +227,6 @@ class BasePyParam:
         pass
 
     @staticmethod
-    @abstractmethod
     def from_dict(**kwargs) -> "BasePyParam":
         """
         Create pyparam from python dictionary
@@ -187,20 +249,14 @@ class BasePyParam:
             args: a list of PyParam args
             kwargs: a dict with PyParam kwargs
         """
-        value_args = node.value.args
-        value_keywords = node.value.keywords
-        args = []
-        keywords = {}
-        for arg_node in value_args:
-            args.append(ast_node_to_value(arg_node))
-
-        for keyword in value_keywords:
-            keywords[keyword.arg] = ast_node_to_value(keyword.value)
-
+        to_value = ast_node_to_value
+        call = node.value
+        args = [to_value(arg_node) for arg_node in call.args]
+        keywords = {keyword.arg: to_value(keyword.value) for keyword in call.keywords}
         return args, keywords
 
 
-@dc.dataclass(frozen=True)
+@dc.dataclass(frozen=True, **DATACLASS_SLOTS_KWARGS)
 class NamedBasePyParam(BasePyParam):
     """A named version of the PyParam - a py param with string name
 
@@ -221,7 +277,6 @@ class NamedBasePyParam(BasePyParam):
         pass
 
     @staticmethod
-    @abstractmethod
     def from_ast_node(node: ast.AnnAssign) -> "NamedBasePyParam":
         """Converts AST node to PyParam object
 
@@ -234,7 +289,7 @@ class NamedBasePyParam(BasePyParam):
         pass
 
 
-@dc.dataclass(frozen=True)
+@dc.dataclass(frozen=True, **DATACLASS_SLOTS_KWARGS)
 class PyParam(BasePyParam):
     """
     PyParam container.
@@ -265,8 +320,8 @@ class PyParam(BasePyParam):
                 dtype = type(self.value)
                 return self.replace(dtype=dtype)
 
-            if type(self.dtype) == str:
-                dtype = _str_to_dtype.get(self.dtype, None)
+            if isinstance(self.dtype, str):
+                dtype = _str_to_dtype.get(self.dtype)
                 if dtype is None:
                     raise ValueError(f"Unsupported PyParam dtype: {self.dtype}")
 
@@ -285,7 +340,7 @@ class PyParam(BasePyParam):
             config: a python dictionary version of PyParam object
         """
         params = {"dtype": self.dtype.__name__, "value": self.value}
-        if len(self.desc) != 0:
+        if self.desc:
             params["desc"] = self.desc
         return params
 
@@ -342,14 +397,22 @@ class PyParam(BasePyParam):
         Returns:
             node: an AST node of PyParam object e.g. PyParam(value=4, dtype=int, scope='loop')
         """
-        fixed_dtype = self.replace(dtype=_dtype_to_str[self.dtype])
-        node = value_to_ast_node(str(fixed_dtype), type)
+        node = ast.Call(
+            func=ast.Name(id=PyParam.__name__, ctx=ast.Load()),
+            args=[],
+            keywords=[
+                ast.keyword(arg="value", value=value_to_ast_node(self.value, self.dtype)),
+                ast.keyword(arg="dtype", value=_constant_node(_dtype_to_str[self.dtype])),
+                ast.keyword(arg="scope", value=_constant_node(self.scope)),
+                ast.keyword(arg="desc", value=_constant_node(self.desc)),
+            ],
+        )
         node.lineno = lineno
         node.col_offset = col_offset
-        return node
+        return ast.fix_missing_locations(node)
 
 
-@dc.dataclass(frozen=True)
+@dc.dataclass(frozen=True, **DATACLASS_SLOTS_KWARGS)
 class NamedPyParam(NamedBasePyParam):
     """A named version of the PyParam. The name comes from the PyParam definition
     in the python file. For example if following line is defined in some python
@@ -365,6 +428,28 @@ class NamedPyParam(NamedBasePyParam):
     """
 
     param: PyParam
+    _full_name: str = dc.field(init=False, repr=False, compare=False)
+    _hash: Optional[int] = dc.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        # full_name is used as a dict key by the parser, so it is computed
+        # only once
+        scope = self.param.scope or ""
+        if scope and not scope.endswith("/"):
+            scope += "/"
+        object.__setattr__(self, "_full_name", scope + self.name)
+
+    def __hash__(self) -> int:
+        # computed on first use, since the value may be unhashable (e.g. a list)
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash((self.name, self.param)))
+        return self._hash
+
+    def __reduce__(self):
+        # the cached hash depends on PYTHONHASHSEED, so it is not pickled
+        return self.__class__, (self.name, self.param)
 
     def to_dict(self) -> Dict[str, Any]:
         """Returns NamedPyParam as python dict"""
@@ -418,11 +503,11 @@ class NamedPyParam(NamedBasePyParam):
         Returns:
             full_name: a full path to the variable
         """
-        return os.path.join(self.scope, self.name)
+        return self._full_name
 
     @property
-    @abstractmethod
     def value(self) -> Any:
+        """Get value parameter from the PyParam object"""
         return self.param.value
 
     def param_replace(self, **kwargs: Any) -> "NamedPyParam":
@@ -1,13 +1,21 @@
 """A  implementation of params parser using AST package"""
 import ast
+import io
+import re
+import sys
 from collections import OrderedDict
 from copy import deepcopy
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Any, Dict, Tuple, TypeVar, Optional, Union
 
-import astor
 import yaml
-from astor.source_repr import split_lines
+
+try:
+    # libyaml bindings are much faster than pure python implementation
+    from yaml import CSafeDumper as YamlSafeDumper, CFullLoader as YamlFullLoader
+except ImportError:
+    from yaml import SafeDumper as YamlSafeDumper, FullLoader as YamlFullLoader
 
 import pyparams.utils as utils
 from pyparams.pyparam import (
@@ -21,27 +29,184 @@ NamedBasePyParamType = TypeVar("NamedBasePyParamType")
 COMPILED_SOURCE_INDENTATION = " " * 2
 VERSION_PARAM_KEY_NAME = "version"
 YAML_CONFIG_INDENTATION = 4
+AST_PARSE_CACHE_SIZE = 128
+
+
+# plain (not quoted) YAML scalars which can be written by _fast_yaml_dump,
+# other strings are written by the yaml library
+_RE_YAML_PLAIN_STR = re.compile(r"[A-Za-z_][A-Za-z0-9 _.,()/'+=-]*")
+_YAML_RESOLVER = yaml.resolver.Resolver()
+_YAML_STR_TAG = "tag:yaml.org,2002:str"
+
+
+class _UnsupportedYamlValue(Exception):
+    """Raised by _fast_yaml_dump for values which it cannot represent"""
+
+
+def _yaml_plain_scalar(value: Any) -> str:
+    """Returns value as a plain YAML scalar, the same as yaml.SafeDumper does
+
+    Raises:
+        _UnsupportedYamlValue: when value would be quoted or is not a scalar
+    """
+    dtype = type(value)
+    if dtype is str:
+        if (
+            _RE_YAML_PLAIN_STR.fullmatch(value) is None
+            or value.endswith(" ")
+            or _YAML_RESOLVER.resolve(yaml.ScalarNode, value, (True, False))
+            != _YAML_STR_TAG
+        ):
+            raise _UnsupportedYamlValue(value)
+        return value
+    elif dtype is bool:
+        return "true" if value else "false"
+    elif dtype is int:
+        return str(value)
+    elif dtype is float:
+        if value != value or value in (float("inf"), float("-inf")):
+            raise _UnsupportedYamlValue(value)
+        text = repr(value).lower()
+        if "." not in text and "e" in text:
+            text = text.replace("e", ".0e", 1)
+        return text
+    elif value is None:
+        return "null"
+    raise _UnsupportedYamlValue(value)
+
+
+def _write_yaml_plain(
+    out: io.StringIO, prefix: str, text: str, indent: int, width: int
+) -> None:
+    """Writes `prefix text` line, long text is broken at single spaces like
+    in the yaml emitter.
+    """
+    out.write(prefix)
+    out.write(" ")
+    column = len(prefix) + 1
+    if " " not in text or column + len(text) <= width:
+        out.write(text)
+        out.write("\n")
+        return
+
+    spaces = False
+    start = end = 0
+    while end <= len(text):
+        ch = text[end] if end < len(text) else None
+        if spaces:
+            if ch != " ":
+                if start + 1 == end and column > width:
+                    out.write("\n" + " " * indent)
+                    column = indent
+                else:
+                    out.write(text[start:end])
+                    column += end - start
+                start = end
+        elif ch is None or ch == " ":
+            out.write(text[start:end])
+            column += end - start
+            start = end
+        if ch is not None:
+            spaces = ch == " "
+        end += 1
+    out.write("\n")
+
+
+def _write_yaml_mapping(
+    out: io.StringIO, data: Dict[str, Any], column: int, width: int
+) -> None:
+    if len(data) == 0:
+        raise _UnsupportedYamlValue(data)
+
+    # OrderedDict keeps its order, regular dicts are sorted by the yaml dumper
+    items = data.items() if isinstance(data, OrderedDict) else sorted(data.items())
+    for key, value in items:
+        # long keys are written as `? key` by the yaml emitter, the python
+        # emitter counts the "!!str" tag into its 128 characters limit
+        if type(key) is not str or len(key) >= 128 - len("!!str"):
+            raise _UnsupportedYamlValue(key)
+
+        prefix = " " * column + _yaml_plain_scalar(key) + ":"
+        if isinstance(value, dict):
+            out.write(prefix + "\n")
+            _write_yaml_mapping(out, value, column + YAML_CONFIG_INDENTATION, width)
+        elif type(value) in (list, tuple):
+            if len(value) == 0:
+                raise _UnsupportedYamlValue(value)
+            out.write(prefix + "\n")
+            for item in value:
+                _write_yaml_plain(
+                    out,
+                    " " * column + "-",
+                    _yaml_plain_scalar(item),
+                    column + YAML_CONFIG_INDENTATION,
+                    width,
+                )
+        else:
+            _write_yaml_plain(
+                out,
+                prefix,
+                _yaml_plain_scalar(value),
+                column + YAML_CONFIG_INDENTATION,
+                width,
+            )
+
+
+def _fast_yaml_dump(data: Dict[str, Any], width: int) -> Optional[str]:
+    """Writes pyparams config tree as YAML without the yaml library. Only
+    nested mappings with plain scalars and lists of plain scalars are
+    supported, the output is the same as yaml.dump(default_flow_style=False).
+
+    Args:
+        data: a pyparams config tree
+        width: preferred line width
+
+    Returns:
+        yaml_string: YAML document or None when data contains values which
+            are not supported
+    """
+    out = io.StringIO()
+    try:
+        _write_yaml_mapping(out, data, 0, width)
+    except _UnsupportedYamlValue:
+        return None
+    return out.getvalue()
 
 
-def pyparams_ordered_yaml_dump(data, stream=None, **kwds):
-    """Fixes rendering of OrderedDict in the yaml file"""
+def pyparams_ordered_yaml_dump(data, stream=None, fast=False, **kwds):
+    """Fixes rendering of OrderedDict in the yaml file. When fast=True simple
+    config trees are written without the yaml library, with the same result.
+    """
+    yaml_string = None
+    if fast and set(kwds) <= {"width", "default_flow_style"}:
+        width = kwds.get("width", 80)
+        if kwds.get("default_flow_style") is False and width > YAML_CONFIG_INDENTATION * 2:
+            yaml_string = _fast_yaml_dump(data, width)
 
-    class OrderedDumper(yaml.SafeDumper):
-        pass
+    if yaml_string is None:
 
-    def _dict_representer(dumper, data):
-        return dumper.represent_mapping(
-            yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, data.items()
+        class OrderedDumper(YamlSafeDumper):
+            pass
+
+        def _dict_representer(dumper, data):
+            return dumper.represent_mapping(
+                yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, data.items()
+            )
+
+        OrderedDumper.add_representer(OrderedDict, _dict_representer)
+        yaml_string = yaml.dump(
+            data, stream=None, Dumper=OrderedDumper, indent=YAML_CONFIG_INDENTATION, **kwds
         )
 
-    OrderedDumper.add_representer(OrderedDict, _dict_representer)
-    yaml_string = yaml.dump(
-        data, stream=None, Dumper=OrderedDumper, indent=YAML_CONFIG_INDENTATION, **kwds
+    # converted lines are written directly to the stream, without building
+    # the whole converted config in memory
+    lines = utils.iter_desc_field_to_comment(
+        yaml_string.split("\n"), indent=YAML_CONFIG_INDENTATION
     )
-    yaml_string = utils.convert_desc_field_to_comment(
-        yaml_string, indent=YAML_CONFIG_INDENTATION
-    )
-    return stream.write(yaml_string)
+    stream.write(next(lines, ""))
+    for line in lines:
+        stream.write("\n")
+        stream.write(line)
 
 
 def read_source_code(filepath: Path) -> str:
@@ -53,9 +218,23 @@ def read_source_code(filepath: Path) -> str:
     Returns:
         source: a content of the file returned as single string
     """
-    with open(str(filepath), "r") as file:
-        source_code = "".join(file.readlines())
-    return source_code
+    return Path(filepath).read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=AST_PARSE_CACHE_SIZE)
+def parse_source_code(source: str) -> ast.Module:
+    """Parses python source code to the AST Module. Results are cached
+    by the source string, so the returned tree is shared between callers
+    and must not be modified. Use `ast.parse` directly when the tree is
+    going to be transformed e.g. with ast.NodeTransformer.
+
+    Args:
+        source: a string representation of the python file
+
+    Returns:
+        root_module: a root AST Module of the source code
+    """
+    return ast.parse(source=source)
 
 
 def read_yaml_file(filepath: Path) -> Dict[str, Any]:
@@ -67,18 +246,106 @@ def read_yaml_file(filepath: Path) -> Dict[str, Any]:
     Returns:
         config: a content of the yaml file returned a python dictionary
     """
-    with open(str(filepath), "r") as file:
-        config_str = utils.convert_comment_to_desc_field("".join(file.readlines()))
-        config = yaml.load(config_str, Loader = yaml.FullLoader)
+    config_str = utils.convert_comment_to_desc_field(
+        Path(filepath).read_text(encoding="utf-8")
+    )
+    config = yaml.load(config_str, Loader=YamlFullLoader)
     return config
 
 
 def astor_pretty_source_formatter(source):
     """ Prettify the source.
     """
+    from astor.source_repr import split_lines
+
     return "".join(split_lines(source, maxline=10e6))
 
 
+if hasattr(ast, "_Unparser") and hasattr(ast._Unparser, "_write_docstring"):
+
+    class _SourceUnparser(ast._Unparser):
+        """ast.unparse which renders every string statement like a docstring.
+        PyParams comment blocks e.g. in included sources are string statements
+        and stay readable triple quoted strings.
+        """
+
+        def visit_Expr(self, node):
+            if isinstance(node.value, ast.Constant) and isinstance(
+                node.value.value, str
+            ):
+                self._write_docstring(node.value)
+            else:
+                super().visit_Expr(node)
+
+    def _unparse(module: ast.Module) -> str:
+        return _SourceUnparser().visit(module)
+
+
+else:
+    _unparse = getattr(ast, "unparse", None)
+
+
+def _reindent_source(source: str, indent: str) -> str:
+    """Replaces 4 spaces indentation of the source generated with ast.unparse
+    with `indent`. ast.unparse renders multiline strings only as docstrings
+    starting at the beginning of the line, lines of these strings are not
+    modified.
+
+    Args:
+        source: a source code generated with ast.unparse
+        indent: a new indentation string
+
+    Returns:
+        reindented source code
+    """
+    unparse_indent = " " * 4
+    if indent == unparse_indent:
+        return source
+
+    lines = source.split("\n")
+    docstring_quote = None
+    for lineno, line in enumerate(lines):
+        if docstring_quote is not None:
+            if docstring_quote in line:
+                docstring_quote = None
+            continue
+
+        code = line.lstrip(" ")
+        level = (len(line) - len(code)) // len(unparse_indent)
+        lines[lineno] = indent * level + code
+
+        quote = code[:3]
+        if quote in ('"""', "'''") and quote not in code[3:]:
+            docstring_quote = quote
+
+    return "\n".join(lines)
+
+
+def render_module(module: ast.Module) -> str:
+    """Converts AST Module to the source code indented with
+    COMPILED_SOURCE_INDENTATION. Uses ast.unparse when available (python 3.9+)
+    and astor for older versions of python.
+
+    Args:
+        module: a root AST Module of the source code
+
+    Returns:
+        source: a string representation of the python file
+    """
+    if sys.version_info >= (3, 9):
+        source = _unparse(module)
+        return _reindent_source(source, COMPILED_SOURCE_INDENTATION) + "\n"
+
+    # astor is imported only when ast.unparse is not available
+    import astor
+
+    return astor.to_source(
+        module,
+        indent_with=COMPILED_SOURCE_INDENTATION,
+        pretty_source=astor_pretty_source_formatter,
+    )
+
+
 def find_pyparams_assignments_nodes(
     node: ast.Module, assigment_op_name: str = PyParam.__name__
 ) -> List[Union[ast.AnnAssign, ast.Assign]]:
@@ -99,60 +366,64 @@ def find_pyparams_assignments_nodes(
 
     """
 
-    supported_nodes = [ast.AnnAssign, ast.Assign]
-
     pyparams_nodes = []
+    _find_pyparams_assignments_nodes(node, assigment_op_name, pyparams_nodes)
+    return pyparams_nodes
+
+
+def _find_pyparams_assignments_nodes(
+    node: ast.AST, assigment_op_name: str, pyparams_nodes: List[ast.AST]
+) -> None:
+    """Appends pyparams assignments found in the node body to pyparams_nodes"""
     for element in node.body:
-        if element.__dict__.get("body", None) is not None:
-            pyparams_nodes += find_pyparams_assignments_nodes(
-                element, assigment_op_name=assigment_op_name
-            )
+        if getattr(element, "body", None) is not None:
+            _find_pyparams_assignments_nodes(element, assigment_op_name, pyparams_nodes)
 
         # dealing with function definition arguments
         if isinstance(element, ast.FunctionDef):
-
             defaults = element.args.defaults
-            num_defaults = len(defaults)
-            args = element.args.args[-num_defaults:]
-            arg_nodes = []
+            args = element.args.args[-len(defaults) :] if defaults else []
             for arg, default in zip(args, defaults):
-                arg_nodes.append(ast.Assign(
-                    targets=[ast.Name(arg.arg, None)], value=default)
-                )
+                if _is_named_call(default):
+                    _append_call_assignment(
+                        ast.Assign(targets=[ast.Name(arg.arg, None)], value=default),
+                        assigment_op_name,
+                        pyparams_nodes,
+                    )
 
-            body_element = ast.Module(arg_nodes)
-            pyparams_nodes += find_pyparams_assignments_nodes(
-                body_element, assigment_op_name=assigment_op_name
-            )
+        if isinstance(element, (ast.AnnAssign, ast.Assign)) and _is_named_call(
+            element.value
+        ):
+            _append_call_assignment(element, assigment_op_name, pyparams_nodes)
 
-        # must be AnnAssign
-        if any([isinstance(element, sn) for sn in supported_nodes]):
-            # value must be Call
-            if isinstance(element.value, ast.Call):
-                # func must be named
-                if isinstance(element.value.func, ast.Name):
-                    func_id = element.value.func.id
-                    # the name of the function must be e.g. "PyParam"
-                    if func_id == assigment_op_name:
-                        pyparams_nodes += [element]
-                    else:
-                        # loop over the arguments of some Func(**kwargs) declaration
-                        # note only named keywords are supported
-                        kwarg_nodes = []
-                        for keyword in element.value.keywords:
-                            kwarg_nodes.append(
-                                ast.Assign(
-                                    targets=[ast.Name(keyword.arg, None)],
-                                    value=keyword.value
-                                )
-                            )
-
-                        body_element = ast.Module(kwarg_nodes)
-                        pyparams_nodes += find_pyparams_assignments_nodes(
-                            body_element, assigment_op_name=assigment_op_name
-                        )
 
-    return pyparams_nodes
+def _is_named_call(node: Optional[ast.AST]) -> bool:
+    """Checks whether node is a call of a named function e.g. `PyParam(...)`"""
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+
+
+def _append_call_assignment(
+    element: Union[ast.AnnAssign, ast.Assign],
+    assigment_op_name: str,
+    pyparams_nodes: List[ast.AST],
+) -> None:
+    """Appends assignment of the `assigment_op_name` call to pyparams_nodes. For
+    other calls their keyword arguments are scanned e.g. `Func(x=PyParam(...))`.
+    Note only named keywords are supported.
+    """
+    call = element.value
+    # the name of the function must be e.g. "PyParam"
+    if call.func.id == assigment_op_name:
+        pyparams_nodes.append(element)
+        return
+
+    for keyword in call.keywords:
+        if _is_named_call(keyword.value):
+            _append_call_assignment(
+                ast.Assign(targets=[ast.Name(keyword.arg, None)], value=keyword.value),
+                assigment_op_name,
+                pyparams_nodes,
+            )
 
 
 def find_function_def_nodes(node: ast.Module) -> List[ast.FunctionDef]:
@@ -192,10 +463,13 @@ def find_ast_expr_nodes(node: ast.Module, assigment_op_name: str) -> List[ast.Ex
             pyparams_nodes += find_ast_expr_nodes(
                 element, assigment_op_name=assigment_op_name
             )
-        if type(element) == ast.Expr:
-            if type(element.value) == ast.Call:
-                if ast_node_to_value(element.value.func) == assigment_op_name:
-                    pyparams_nodes.append(element)
+        if type(element) == ast.Expr and type(element.value) == ast.Call:
+            func = element.value.func
+            # most calls are plain names, other forms e.g. attributes are
+            # resolved by the generic converter
+            name = func.id if type(func) == ast.Name else ast_node_to_value(func)
+            if name == assigment_op_name:
+                pyparams_nodes.append(element)
 
     return pyparams_nodes
 
@@ -216,19 +490,20 @@ def get_all_pyparams_from_source_code(
         params: a list NamedPyParam found in the source code.
     """
 
-    root_module = ast.parse(source=source)
+    root_module = parse_source_code(source)
     pyparams_nodes = find_pyparams_assignments_nodes(
         root_module, assigment_op_name=assigment_op_name
     )
     return [ast_parser.from_ast_node(node) for node in pyparams_nodes]
 
 
-def get_source_params_assignments(
+def get_source_params_with_assignments(
     source: str,
     assigment_op_name: str = PyParam.__name__,
     ast_parser: NamedBasePyParamType = NamedPyParam,
-) -> Tuple[Dict[str, ast.AnnAssign], ast.Module]:
-    """Find all AnnAssign in the source code.
+) -> Tuple[List[NamedBasePyParamType], Dict[str, ast.AnnAssign], ast.Module]:
+    """Reads all params from the source code together with their AnnAssign
+    nodes. The source code is parsed and scanned only once.
 
     Args:
         source: a string representation of the python file
@@ -236,61 +511,95 @@ def get_source_params_assignments(
         ast_parser: a class with function from_ast_node(node) and full_name property
 
     Returns:
+        params: a list of params found in the source code
         named_nodes: a dictionary with {pyparam.full_name: AnnAssign}
         source_code_module: a root AST Module of the source code
     """
+    # returned nodes are modified by the callers, so the cached tree from
+    # parse_source_code cannot be used. Parsing is ~4x faster than deepcopy
+    # of the cached tree.
     source_code_module = ast.parse(source=source)
     pyparams_nodes = find_pyparams_assignments_nodes(
         source_code_module, assigment_op_name=assigment_op_name
     )
 
+    params = []
     named_nodes = {}
     for node in pyparams_nodes:
         pyparam: NamedBasePyParam = ast_parser.from_ast_node(node)
+        params.append(pyparam)
         named_nodes[pyparam.full_name] = node
 
+    return params, named_nodes, source_code_module
+
+
+def get_source_params_assignments(
+    source: str,
+    assigment_op_name: str = PyParam.__name__,
+    ast_parser: NamedBasePyParamType = NamedPyParam,
+) -> Tuple[Dict[str, ast.AnnAssign], ast.Module]:
+    """Find all AnnAssign in the source code.
+
+    Args:
+        source: a string representation of the python file
+        assigment_op_name: a name of the assignment function e.g. PyParam.__name__
+        ast_parser: a class with function from_ast_node(node) and full_name property
+
+    Returns:
+        named_nodes: a dictionary with {pyparam.full_name: AnnAssign}
+        source_code_module: a root AST Module of the source code
+    """
+    _, named_nodes, source_code_module = get_source_params_with_assignments(
+        source, assigment_op_name=assigment_op_name, ast_parser=ast_parser
+    )
     return named_nodes, source_code_module
 
 
-def params_to_yaml_config(
-    config_params: List[NamedBasePyParam], save_file_path: Path
-) -> None:
-    """Convert list of params to the YAML file
+def params_to_config_dict(config_params: List[NamedBasePyParam]) -> OrderedDict:
+    """Convert list of params to the nested dictionary with the same structure
+    as the YAML config file.
 
     Args:
         config_params: a list of NamedPyParam
-        save_file_path: path location of the YAML file
 
+    Returns:
+        config: a nested dictionary with params definitions
     """
-    save_file_path = str(save_file_path)
-
     config_params_dict = {param.full_name: param for param in config_params}
     params_tree = OrderedDict()
 
-    def insert_node(sc: str, param: NamedBasePyParam, config: Dict[str, Any]) -> None:
-        nodes = sc.split("/")
-        if len(nodes) > 1:
-            head, tail = nodes[0], "/".join(nodes[1:])
-            if head not in config:
-                config[head] = OrderedDict()
-            insert_node(tail, param, config[head])
-        else:
-            if len(sc) > 0:
-                if sc not in config:
-                    config[sc] = OrderedDict()
+    for full_name, param in config_params_dict.items():
+        nodes = full_name.split("/")
+        # the last node is the name of the param, an empty scope
+        # or trailing "/" in the scope does not create a new level
+        nodes.pop()
+        if nodes and nodes[-1] == "":
+            nodes.pop()
 
-                config[sc][param.name] = param.to_dict()
-            else:
-                config[param.name] = param.to_dict()
-            return
+        config = params_tree
+        for node in nodes:
+            if node not in config:
+                config[node] = OrderedDict()
+            config = config[node]
+        config[param.name] = param.to_dict()
+
+    return params_tree
+
+
+def params_to_yaml_config(
+    config_params: List[NamedBasePyParam], save_file_path: Path
+) -> None:
+    """Convert list of params to the YAML file
 
-    for scope, params in config_params_dict.items():
-        head = "/".join(scope.split("/")[:-1])
-        insert_node(head, params, params_tree)
+    Args:
+        config_params: a list of NamedPyParam
+        save_file_path: path location of the YAML file
 
-    with open(save_file_path, "w") as outfile:
+    """
+    params_tree = params_to_config_dict(config_params)
+    with open(str(save_file_path), "w") as outfile:
         pyparams_ordered_yaml_dump(
-            params_tree, stream=outfile, width=60, default_flow_style=False
+            params_tree, stream=outfile, fast=True, width=60, default_flow_style=False
         )
 
 
@@ -322,13 +631,21 @@ def read_params_from_config(config: dict, _root_name: str = "") -> List[NamedPyP
         return "value" in node and "dtype" in node
 
     params = []
-    for name, node in config.items():
-        if _is_end_node(node):
-            # extract scope from the full path. Note: _root_name.split("/")[0] == "/"
-            node["scope"] = "/".join(_root_name.split("/")[1:])
-            params += [NamedPyParam.from_dict(name, node)]
+    # depth first walk over the nested dictionaries, the stack keeps the path
+    # to the current node and iterators over the remaining entries
+    stack = [(_root_name, iter(config.items()))]
+    while stack:
+        root_name, items = stack[-1]
+        for name, node in items:
+            if _is_end_node(node):
+                # extract scope from the full path. Note: root_name starts with "/"
+                node["scope"] = root_name.partition("/")[2]
+                params.append(NamedPyParam.from_dict(name, node))
+            else:
+                stack.append((root_name + "/" + name, iter(node.items())))
+                break
         else:
-            params += read_params_from_config(node, "/".join([_root_name, name]))
+            stack.pop()
     return params
 
 
@@ -382,6 +699,9 @@ def get_default_compile_node_transformer(
     Returns:
         Node transformer
     """
+    # keyword arguments and function defaults are matched by their value node,
+    # AST nodes compare by identity, so they can be looked up by id
+    value_to_param = {id(node.value): param for node, param in node_to_param.items()}
 
     class DefaultASTTransformer(ast.NodeTransformer):
         def visit_AnnAssign(self, node: ast.AnnAssign) -> ast.AST:
@@ -410,16 +730,13 @@ def get_default_compile_node_transformer(
                 )
                 return node
             elif isinstance(node.value, ast.Call) and len(node.value.keywords) > 0:
-                new_keywords = []
                 for keyword in node.value.keywords:
-                    for n, p in node_to_param.items():
-                        if n.value == keyword.value:
-                            keyword.value = p.to_ast_node(
-                                lineno=keyword.value.lineno,
-                                col_offset=keyword.value.col_offset
-                            )
-                    new_keywords.append(keyword)
-                node.value.keywords = new_keywords
+                    p = value_to_param.get(id(keyword.value))
+                    if p is not None:
+                        keyword.value = p.to_ast_node(
+                            lineno=keyword.value.lineno,
+                            col_offset=keyword.value.col_offset
+                        )
                 return node
             else:
                 return node
@@ -429,19 +746,15 @@ def get_default_compile_node_transformer(
             For nodes: replace with static value
             """
 
-            defaults = node.args.defaults
-            num_defaults = len(defaults)
-            args = node.args.args[-num_defaults:]
-
             new_defaults = []
-            for arg, default in zip(args, defaults):
-                for n, p in node_to_param.items():
-                    if n.value == default:
-                        new_default = p.to_ast_node(
-                            lineno=default.lineno,
-                            col_offset=default.col_offset
-                        )
-                        new_defaults.append(new_default)
+            for default in node.args.defaults:
+                p = value_to_param.get(id(default))
+                if p is not None:
+                    default = p.to_ast_node(
+                        lineno=default.lineno,
+                        col_offset=default.col_offset
+                    )
+                new_defaults.append(default)
             node.args.defaults = new_defaults  # transform function arguments assignments
             # traverse subsequent nodes
             return self.generic_visit(node)
@@ -524,14 +837,21 @@ def compile_source_code_from_configs_list(
                 f"contain `{VERSION_PARAM_KEY_NAME}` template parameter."
             )
 
-        if VERSION_PARAM_KEY_NAME not in [param.name for param in config_params]:
+        # when version is defined multiple times, the last definition is used
+        version_param = next(
+            (
+                param
+                for param in reversed(config_params)
+                if param.name == VERSION_PARAM_KEY_NAME
+            ),
+            None,
+        )
+        if version_param is None:
             raise ValueError(
                 f"Config must have defined `{VERSION_PARAM_KEY_NAME}` field."
             )
 
-        config_version = {param.name: param.value for param in config_params}[
-            VERSION_PARAM_KEY_NAME
-        ]
+        config_version = version_param.value
 
         source_code_version = NamedPyParam.from_ast_node(
             named_nodes[VERSION_PARAM_KEY_NAME]
@@ -547,11 +867,7 @@ def compile_source_code_from_configs_list(
         node_transformer = get_default_compile_node_transformer(node_to_config_param)
 
     new_root_module = node_transformer.visit(root_module)
-    return astor.to_source(
-        new_root_module,
-        indent_with=COMPILED_SOURCE_INDENTATION,
-        pretty_source=astor_pretty_source_formatter,
-    )
+    return render_module(new_root_module)
 
 
 def update_source_pyparams(source_code: str, new_params: List[NamedPyParam]) -> str:
@@ -565,21 +881,21 @@ def update_source_pyparams(source_code: str, new_params: List[NamedPyParam]) ->
     Returns:
         new source code with pyparams parameters adapted from new_params list
     """
-    pyparams = get_all_pyparams_from_source_code(source_code)
-    named_nodes, source_code_module = get_source_params_assignments(source_code)
+    pyparams, named_nodes, source_code_module = get_source_params_with_assignments(
+        source_code
+    )
 
-    node_to_config_param = {}
+    # nodes to be replaced are known, so they are modified in place instead
+    # of visiting the whole tree with get_render_as_ast_node_transformer
     for named_param, new_param in zip(pyparams, new_params):
-        node_to_config_param[named_nodes[named_param.full_name]] = new_param
+        node = named_nodes[named_param.full_name]
+        # like the transformer, render only annotated assignments
+        if isinstance(node, ast.AnnAssign):
+            node.value = new_param.param.render_as_ast_node(
+                lineno=node.value.lineno, col_offset=node.value.col_offset
+            )
 
-    transformer = get_render_as_ast_node_transformer(node_to_config_param)
-    new_root_module = transformer.visit(source_code_module)
-    new_source = astor.to_source(
-        new_root_module,
-        indent_with=COMPILED_SOURCE_INDENTATION,
-        pretty_source=astor_pretty_source_formatter,
-    )
-    return new_source
+    return render_module(source_code_module)
 
 
 def replace_param(
@@ -606,6 +922,31 @@ def replace_param(
     config_params_dict = {
         config_param.full_name: config_param for config_param in config_params
     }
+    if not _replace_param_inplace(param, config_params_dict, ignore_missing_keys):
+        return config_params
+
+    return list(config_params_dict.values())
+
+
+def _replace_param_inplace(
+    param: NamedPyParam,
+    config_params_dict: Dict[str, NamedPyParam],
+    ignore_missing_keys: bool,
+) -> bool:
+    """Replace parameter param.full_name in the config_params_dict
+
+    Args:
+        param: a new param to be substituted in the config_params_dict
+        config_params_dict: a dictionary with {param.full_name: param}
+        ignore_missing_keys: if True, it skips param which is
+            not present in config_params_dict, otherwise exception will be raised
+
+    Returns:
+        found: False when param was missing and ignored
+
+    Raises:
+         ValueError: when config_params_dict does not have param.full_name
+    """
     if param.full_name not in config_params_dict:
         if not ignore_missing_keys:
             raise ValueError(
@@ -617,24 +958,23 @@ def replace_param(
             f"\n\tname      = {param.full_name}"
             f"\n\tvalue     = {param.value}"
         )
-        return config_params
-    else:
-        if param.full_name != "version":
-            old_value = config_params_dict[param.full_name].value
-            new_value = param.value
-            if old_value != new_value:
-                print(
-                    f"Replacing parameter:"
-                    f"\n\tname      = {param.full_name}"
-                    f"\n\told value = {old_value}"
-                    f"\n\tnew value = {new_value}"
-                )
-            else:
-                print(f"Parameter not changed: {param.full_name}")
-
-            config_params_dict[param.full_name] = param
+        return False
+
+    if param.full_name != "version":
+        old_value = config_params_dict[param.full_name].value
+        new_value = param.value
+        if old_value != new_value:
+            print(
+                f"Replacing parameter:"
+                f"\n\tname      = {param.full_name}"
+                f"\n\told value = {old_value}"
+                f"\n\tnew value = {new_value}"
+            )
+        else:
+            print(f"Parameter not changed: {param.full_name}")
 
-    return list(config_params_dict.values())
+        config_params_dict[param.full_name] = param
+    return True
 
 
 def replace_params(
@@ -655,12 +995,23 @@ def replace_params(
             replaced.
     """
 
+    if len(params_to_replace) == 0:
+        return config_params
+
+    # copy the config only once and replace all params in a single dictionary
+    config_params = deepcopy(config_params)
+    config_params_dict = {
+        config_param.full_name: config_param for config_param in config_params
+    }
+    found = False
     for param in params_to_replace:
-        config_params = replace_param(
-            param, config_params, ignore_missing_keys=ignore_missing_keys
+        found |= _replace_param_inplace(
+            param, config_params_dict, ignore_missing_keys=ignore_missing_keys
         )
 
-    return config_params
+    if not found:
+        return config_params
+    return list(config_params_dict.values())
 
 
 def substitute_config(
@@ -693,11 +1044,16 @@ def substitute_config(
 
     if selected_keys is None:
         params_to_replace = new_params
-    else:
+    elif len(selected_keys) == 0:
         params_to_replace = []
-        for param in new_params:
-            if any([key in param.full_name for key in selected_keys]):
-                params_to_replace.append(param)
+    else:
+        # match all keys as subwords in a single search
+        selected_keys_pattern = re.compile("|".join(map(re.escape, selected_keys)))
+        params_to_replace = [
+            param
+            for param in new_params
+            if selected_keys_pattern.search(param.full_name)
+        ]
 
     config_params = replace_params(
         params_to_replace, old_params, ignore_missing_keys=ignore_missing_keys
@@ -721,18 +1077,26 @@ def get_param(full_name: str, config_params: List[NamedPyParam]) -> NamedPyParam
     Raises:
         ValueError: when there is no required param in the config_params
     """
-    config_params = deepcopy(config_params)
-
-    config_params_dict = {
-        config_param.full_name: config_param for config_param in config_params
-    }
-    if full_name not in config_params_dict:
+    # the last param with full_name is returned, like in {full_name: param} dict
+    param = next(
+        (
+            config_param
+            for config_param in reversed(config_params)
+            if config_param.full_name == full_name
+        ),
+        None,
+    )
+    if param is None:
+        config_params_dict = {
+            config_param.full_name: config_param for config_param in config_params
+        }
         raise ValueError(
             f"Parameter key:`{full_name}` not found "
             f"in the config: {config_params_dict.keys()}"
         )
 
-    return config_params_dict[full_name]
+    # only the returned param is copied, so its value can be safely modified
+    return deepcopy(param)
 
 
 def add_scope(scope: str, config_params: List[NamedPyParam]) -> List[NamedPyParam]:
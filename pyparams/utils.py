@@ -1,8 +1,10 @@
 import logging
 import re
+import shlex
 import subprocess
 from argparse import ArgumentParser
 from enum import Enum
+from typing import Iterable, Iterator
 
 
 def get_logger(
@@ -25,13 +27,15 @@ def get_logger(
         "[%(asctime)s][%(name)s][%(levelname)s][%(filename)s/%(funcName)s]::%(message)s"
     )
 
-    if enable_stream_handler:
+    # loggers are singletons, so handlers added by previous calls are reused
+    handler_types = {type(handler) for handler in logger.handlers}
+    if enable_stream_handler and logging.StreamHandler not in handler_types:
         stream_handler = logging.StreamHandler()
         stream_handler.setFormatter(formatter)
         logger.setLevel(logging.DEBUG)
         logger.addHandler(stream_handler)
 
-    if enable_file_handler:
+    if enable_file_handler and logging.FileHandler not in handler_types:
         file_handler = logging.FileHandler("log.txt")
         file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
@@ -81,18 +85,20 @@ class RunMode(Enum):
 
 
 class ArgumentParserWithDefaults(ArgumentParser):
-    def add_argument(self, *args, help=None, default=None, **kwargs):
-        if help is not None:
-            kwargs["help"] = help
-        if default is not None:
-            kwargs["default"] = default
-            if help is not None and default != "==SUPPRESS==":
-                kwargs["help"] += f" ( default: {default} )"
+    def add_argument(self, *args, **kwargs):
+        help_text = kwargs.get("help")
+        default = kwargs.get("default")
+        if help_text is not None and default is not None and default != "==SUPPRESS==":
+            kwargs["help"] = f"{help_text} ( default: {default} )"
         super().add_argument(*args, **kwargs)
 
 
 def run_command(
-    command_str: str, can_fail: bool = False, verbose: bool = True, **kwargs
+    command_str: str,
+    can_fail: bool = False,
+    verbose: bool = True,
+    shell_like: bool = False,
+    **kwargs,
 ) -> None:
     """Run bash command
 
@@ -101,14 +107,15 @@ def run_command(
         can_fail: if True run command can fail when executing. This can be useful when
             removing not present file etc
         verbose: whether to print running command information or not
+        shell_like: if True command is split with shell-like syntax so quoted
+            arguments can contain spaces, otherwise it is split on whitespace
+            which is faster
         **kwargs:
 
     """
-    cmd_parts = [
-        part for part in command_str.replace(" ", "\n").split("\n") if len(part) > 0
-    ]
+    cmd_parts = shlex.split(command_str) if shell_like else command_str.split()
 
-    if verbose:
+    if verbose and _logger.isEnabledFor(logging.INFO):
         _logger.info(f"CMD: {' '.join(cmd_parts)}")
 
     if "check" not in kwargs:
@@ -179,6 +186,11 @@ class REMatcher:
         return self.rematch.group(i)
 
 
+# yaml key pattern used when converting yaml configs, other line prefixes
+# are checked with str.startswith after stripping the indentation
+_KEY_RE = re.compile(r"^[ ]*(\w+):")
+
+
 def convert_desc_field_to_comment(pyparam_yaml_config: str, indent: int) -> str:
     """Converts description field `desc` to comment in the YAML file, this makes
     YAML configs more readable for humans like we.
@@ -192,40 +204,56 @@ def convert_desc_field_to_comment(pyparam_yaml_config: str, indent: int) -> str:
         new config in which keys `desc` are replaced with comments
             which start with `#` symbol
     """
-    new_lines = []
+    if "desc:" not in pyparam_yaml_config:
+        return pyparam_yaml_config
+
+    return "\n".join(
+        iter_desc_field_to_comment(pyparam_yaml_config.split("\n"), indent)
+    )
+
+
+def iter_desc_field_to_comment(lines: Iterable[str], indent: int) -> Iterator[str]:
+    """Streaming version of convert_desc_field_to_comment which converts
+    lines of the yaml config one by one.
+
+    Args:
+        lines: lines of the yaml config without line endings
+        indent: yaml indentation i.e. a number of `space` characters
+            before each paragraph
+
+    Returns:
+        lines of the new config in which keys `desc` are replaced with comments
+    """
     desc_lines = []
-    for line in pyparam_yaml_config.split("\n"):
+    desc_start_column = 0
+    for line in lines:
         # contains description ?
-        if REMatcher(line).match(r"^[ ]*desc:(.*)"):
+        stripped = line.lstrip(" ")
+        if stripped.startswith("desc:"):
+            if len(desc_lines) == 0:
+                desc_start_column = len(line) - len(stripped)
             desc_lines.append(line)
             continue
 
         # regular line
         if len(desc_lines) == 0:
-            new_lines.append(line)
+            yield line
         else:
-            desc_start_column = desc_lines[0].index("desc:")
             # long descriptions will have broken lines at
             # desc_start_column + indent - 1
-            if line[desc_start_column + indent - 1] == " ":
+            tail_offset = desc_start_column + indent - 1
+            if line[tail_offset] == " ":
                 desc_lines.append(line)
             else:
-
+                prefix = " " * desc_start_column + "#"
                 for row, desc_line in enumerate(desc_lines):
                     desc_line = desc_line.replace("desc:", "")
-                    idx = desc_start_column
-                    if row == 0:
-                        desc_line = " " * idx + "#" + desc_line[idx:]
-                    else:
-                        desc_line = " " * idx + "#" + desc_line[idx + indent - 1 :]
-
-                    new_lines.append(desc_line)
+                    offset = desc_start_column if row == 0 else tail_offset
+                    yield prefix + desc_line[offset:]
 
-                new_lines.append(line)
+                yield line
                 desc_lines = []
 
-    return "\n".join(new_lines)
-
 
 def convert_comment_to_desc_field(pyparam_yaml_config: str) -> str:
     """A reverse operation to convert_desc_field_to_comment. It reads the
@@ -238,35 +266,32 @@ def convert_comment_to_desc_field(pyparam_yaml_config: str) -> str:
     Returns:
         new string yaml config with comments replaced with `desc` key
     """
-
-    def has_pattern(_line: str, regex: str):
-        return REMatcher(_line).match(regex)
+    if "# " not in pyparam_yaml_config:
+        return pyparam_yaml_config
 
     all_lines = pyparam_yaml_config.split("\n")
     new_lines = []
-    num_lines = len(all_lines)
+    # comment blocks waiting for the dtype key, stored as pairs of the first
+    # comment line index and the index of the placeholder in new_lines
+    pending_comments = []
     for ln, line in enumerate(all_lines):
+        stripped = line.lstrip(" ")
+        if pending_comments and stripped.startswith("dtype:"):
+            desc_start_column = len(line) - len(stripped)
+            for start, slot in pending_comments:
+                comment_line = "".join(
+                    cl[desc_start_column + 1 :] for cl in all_lines[start:ln]
+                )
+                new_lines[slot] = " " * desc_start_column + "desc:" + comment_line
+            pending_comments = []
+
         # contains description ?
-        if has_pattern(line, r"^[ ]*# (.*)"):
-            is_first_line = has_pattern(all_lines[ln - 1], r"^[ ]*(\w+):")
-            if is_first_line:
-                k = 0
-                search_test = False
-                for k in range(num_lines - ln):
-                    if has_pattern(all_lines[ln + 1 + k], r"^[ ]*dtype:"):
-                        search_test = True
-                        break
-
-                if search_test:
-                    desc_start_column = all_lines[ln + 1 + k].index("dtype:")
-                    commented_lines = [
-                        cl[desc_start_column + 1 :] for cl in all_lines[ln : ln + 1 + k]
-                    ]
-                    comment_line = "".join(commented_lines)
-                    desc_line = " " * desc_start_column + "desc:" + comment_line
-                    new_lines.append(desc_line)
-                continue
+        if stripped.startswith("# "):
+            if _KEY_RE.match(all_lines[ln - 1]):
+                pending_comments.append((ln, len(new_lines)))
+                new_lines.append(None)
         else:
             new_lines.append(line)
 
-    return "\n".join(new_lines)
+    # comments which are not followed by dtype key are dropped
+    return "\n".join(line for line in new_lines if line is not None)
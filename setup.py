@@ -1,7 +1,29 @@
+import os
+
 from setuptools import setup, find_packages
 
 VERSION = '0.1.1'
 
+
+def get_ext_modules():
+    """Optionally compiles AST conversion module with Cython. The module is
+    compiled only when PYPARAMS_CYTHONIZE=1 and Cython is installed, otherwise
+    pure python version is used."""
+    if os.environ.get('PYPARAMS_CYTHONIZE', '0') != '1':
+        return []
+
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        print('PyParams: Cython is not installed, skipping compilation')
+        return []
+
+    return cythonize(
+        ['pyparams/pyparam.py'],
+        compiler_directives={'language_level': '3'},
+    )
+
+
 setup(
     name='python-params',
     version=VERSION,
@@ -20,5 +42,6 @@ setup(
     scripts=[
         "scripts/pyparams"
     ],
-    include_package_data=True
+    include_package_data=True,
+    ext_modules=get_ext_modules(),
 )
@@ -1,15 +1,19 @@
 """Tests for tools.pyparam_parser.py"""
 
+import tempfile
 import unittest
+from pathlib import Path
 
 from pyparams import get_project_root_path
 from pyparams import pyparam_parser
 import pyparams.modules_parser as mods
+from pyparams.module import PyParamModule
 
 
 class ModulesImportTest(unittest.TestCase):
-    def setUp(self):
-        self.sample_path = get_project_root_path() / "resources/modules_samples"
+    @classmethod
+    def setUpClass(cls):
+        cls.sample_path = get_project_root_path() / "resources/modules_samples"
 
     def test_include_module(self):
 
@@ -25,6 +29,12 @@ class ModulesImportTest(unittest.TestCase):
             "offset: float = PyParam(value=1.0, dtype='float', "
             "scope='a/matmul', desc='')" in code)
 
+    def test_include_module_multiple_search_folders(self):
+        source_code = pyparam_parser.read_source_code(self.sample_path / "fun_module_import.py")
+        search_folders = [get_project_root_path() / "resources/code_samples", self.sample_path]
+        code = mods.include_modules(source_code, search_folders)
+        self.assertTrue("class _pyparam_module__matmul1():" in code)
+
     def test_derive_module(self):
         source_code = pyparam_parser.read_source_code(self.sample_path / "derive_module.py")
         code = mods.derive_module(source_code, [self.sample_path])
@@ -33,6 +43,38 @@ class ModulesImportTest(unittest.TestCase):
         self.assertTrue(
             "matmul2: Module = IncludeModule(path='fun2_module', scope='c')" in code)
 
+        derive_line = 'DeriveModule("fun_module_import")'
+        for new_derive_line in [
+            "DeriveModule('fun_module_import')",
+            'DeriveModule(path="fun_module_import")',
+            'DeriveModule ("fun_module_import")',
+        ]:
+            with self.subTest(derive_line=new_derive_line):
+                new_source_code = source_code.replace(derive_line, new_derive_line)
+                self.assertEqual(mods.derive_module(new_source_code, [self.sample_path]), code)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # module paths containing "=" are not truncated
+            derived_source = pyparam_parser.read_source_code(self.sample_path / "fun_module_import.py")
+            (Path(tmp_dir) / "fun_module=import.py").write_text(derived_source)
+            for new_derive_line in [
+                'DeriveModule("fun_module=import")',
+                'DeriveModule(path = "fun_module=import")',
+            ]:
+                with self.subTest(derive_line=new_derive_line):
+                    new_source_code = source_code.replace(derive_line, new_derive_line)
+                    self.assertEqual(
+                        mods.derive_module(new_source_code, [Path(tmp_dir), self.sample_path]),
+                        code)
+
+        with self.assertRaises(ValueError):
+            mods.derive_module(source_code.replace(derive_line, "DeriveModule()"),
+                               [self.sample_path])
+
+        with self.assertRaises(ValueError):
+            mods.derive_module(source_code + "\nDeriveModule ('fun_module')\n",
+                               [self.sample_path])
+
     def test_include_from_derived_module(self):
         source_code = pyparam_parser.read_source_code(self.sample_path / "derive_module.py")
         code = mods.include_modules(source_code, [self.sample_path])
@@ -53,4 +95,21 @@ class ModulesImportTest(unittest.TestCase):
 
     def test_include_source_module_decorators(self):
         source_code = pyparam_parser.read_source_code(self.sample_path / "fun_module_import_decorators.py")
-        code = mods.include_modules(source_code, [self.sample_path])
\ No newline at end of file
+        code = mods.include_modules(source_code, [self.sample_path])
+
+    def test_find_module_after_files_change(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = Path(tmp_dir)
+            (folder / "a.py").write_text("a = 1\n")
+            self.assertEqual(PyParamModule("a", "a").find_module_source([folder]), "a = 1\n")
+
+            # modules created and removed after the first lookup
+            (folder / "b.py").write_text("b = 2\n")
+            self.assertEqual(PyParamModule("b", "b").find_module_source([folder]), "b = 2\n")
+            self.assertEqual(PyParamModule("b", "b").module_source(folder), "b = 2\n")
+
+            (folder / "a.py").unlink()
+            with self.assertRaisesRegex(FileNotFoundError, "Cannot find module: a.py"):
+                PyParamModule("a", "a").find_module_source([folder])
+            with self.assertRaisesRegex(FileNotFoundError, "Cannot find module: a.py"):
+                PyParamModule("a", "a").module_source(folder)
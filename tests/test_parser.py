@@ -1,33 +1,175 @@
 """Tests for tools.pyparam_parser.py"""
 
 import ast
+import copy
+import io
+import os
+import pickle
+import subprocess
+import sys
 import tempfile
 import unittest
+from collections import OrderedDict
 from pathlib import Path
 
-import astor
-
 from pyparams import get_project_root_path
 from pyparams import pyparam_parser
 from pyparams.pyparam import PyParam, NamedPyParam
 
 
+# params of template3.py in the order of the definition
+EXPECTED_TEMPLATE3_PARAMS = [
+    NamedPyParam(
+        name="version",
+        param=PyParam(value="1.0", dtype=str, scope="", desc="model version"),
+    ),
+    NamedPyParam(
+        name="base_num_filters",
+        param=PyParam(value=4, dtype=int, scope="feature_extractor", desc=""),
+    ),
+    NamedPyParam(
+        name="include_root",
+        param=PyParam(
+            value=False, dtype=bool, scope="feature_extractor", desc=""
+        ),
+    ),
+    NamedPyParam(
+        name="regularize_depthwise",
+        param=PyParam(
+            value=False, dtype=bool, scope="feature_extractor", desc=""
+        ),
+    ),
+    NamedPyParam(
+        name="activation_fn_in_separable_conv",
+        param=PyParam(
+            value=False, dtype=bool, scope="feature_extractor", desc=""
+        ),
+    ),
+    NamedPyParam(
+        name="entry_flow_blocks",
+        param=PyParam(
+            value=(1, 1, 1),
+            dtype=tuple,
+            scope="feature_extractor",
+            desc="Number of units in each bock in the entry flow.",
+        ),
+    ),
+    NamedPyParam(
+        name="middle_flow_blocks",
+        param=PyParam(
+            value=(1,),
+            dtype=tuple,
+            scope="feature_extractor",
+            desc="Number of units in the middle flow.",
+        ),
+    ),
+]
+
+# params of template3.py after the replacements made in test_replace_param
+EXPECTED_TEMPLATE3_REPLACED_PARAMS = [
+    NamedPyParam(
+        name="activation_fn_in_separable_conv",
+        param=PyParam(
+            value=False, dtype=bool, scope="feature_extractor", desc=""
+        ),
+    ),
+    NamedPyParam(
+        name="base_num_filters",
+        param=PyParam(value=4, dtype=int, scope="feature_extractor", desc=""),
+    ),
+    NamedPyParam(
+        name="entry_flow_blocks",
+        param=PyParam(
+            value=(1, 1),
+            dtype=tuple,
+            scope="feature_extractor",
+            desc="Number of units in each bock in the entry flow.",
+        ),
+    ),
+    NamedPyParam(
+        name="include_root",
+        param=PyParam(
+            value=True, dtype=bool, scope="feature_extractor", desc=""
+        ),
+    ),
+    NamedPyParam(
+        name="middle_flow_blocks",
+        param=PyParam(
+            value=(1,),
+            dtype=tuple,
+            scope="feature_extractor",
+            desc="Number of units in the middle flow.",
+        ),
+    ),
+    NamedPyParam(
+        name="regularize_depthwise",
+        param=PyParam(
+            value=False, dtype=bool, scope="feature_extractor", desc=""
+        ),
+    ),
+    NamedPyParam(
+        name="version",
+        param=PyParam(value="1.0", dtype=str, scope="", desc="model version"),
+    ),
+]
+
+
 class ParserFunctionsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.tmp_dir = cls._tmp.name
+        cls.sample_path = get_project_root_path() / "resources/code_samples"
+        cls._template3_config = pyparam_parser.read_yaml_file(
+            cls.sample_path / "template3_config.yml"
+        )
+        # sources of the templates are read once and shared by all tests
+        cls._template_sources = {
+            path.name: pyparam_parser.read_source_code(path)
+            for path in cls.sample_path.glob("template*.py")
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
     def setUp(self):
-        self.tmp_dir = tempfile.mkdtemp()
-        self.sample_path = get_project_root_path() / "resources/code_samples"
-        self.config_tmp_path = Path(f"{self.tmp_dir}/test.yaml")
-        self.source_code_tmp_path = Path(f"{self.tmp_dir}/compiled.py")
+        # each test writes to its own files inside the shared folder
+        self.config_tmp_path = Path(self.tmp_dir) / f"{self._testMethodName}.yaml"
 
     def test_find_pyparams_assignments(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template1.py")
-        root = ast.parse(source=source_code)
+        root = ast.parse(self._template_sources["template1.py"])
         pyparam_nodes = pyparam_parser.find_pyparams_assignments_nodes(root)
         self.assertEqual(len(pyparam_nodes), 2)
 
+    def test_parse_source_code_is_cached(self):
+        source_code = self._template_sources["template1.py"]
+        root = pyparam_parser.parse_source_code(source_code)
+        self.assertIs(root, pyparam_parser.parse_source_code(source_code))
+        self.assertEqual(ast.dump(root), ast.dump(ast.parse(source=source_code)))
+
+    def test_read_params_values_are_not_shared(self):
+        source_code = "x: list = PyParam([1, 2], dtype=list)\n"
+        pyparam_parser.get_all_pyparams_from_source_code(source_code)[0].value.append(99)
+        pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
+        self.assertEqual(pyparams[0].value, [1, 2])
+
+    def test_render_module(self):
+        source_code = (
+            "def fun(x):\n"
+            "    \"\"\"docstring\n"
+            "        indented line\n"
+            "    \"\"\"\n"
+            "    if x:\n"
+            "        return '''not a docstring'''\n"
+        )
+        source = pyparam_parser.render_module(ast.parse(source_code))
+        self.assertTrue("\n  if x:\n    return 'not a docstring'\n" in source)
+        self.assertTrue("\n        indented line\n" in source)
+        self.assertEqual(ast.dump(ast.parse(source)), ast.dump(ast.parse(source_code)))
+
     def test_ast_assign_to_pyparam(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template1.py")
-        root = ast.parse(source=source_code)
+        root = ast.parse(self._template_sources["template1.py"])
         pyparam_nodes = pyparam_parser.find_pyparams_assignments_nodes(root)
 
         pyparam = NamedPyParam.from_ast_node(pyparam_nodes[0])
@@ -44,8 +186,7 @@ class ParserFunctionsTest(unittest.TestCase):
         self.assertEqual(pyparam, exp_param)
 
     def test_dict_dtype_pyparam(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template6.py")
-        root = ast.parse(source=source_code)
+        root = ast.parse(self._template_sources["template6.py"])
         pyparam_nodes = pyparam_parser.find_pyparams_assignments_nodes(root)
 
         pyparam = NamedPyParam.from_ast_node(pyparam_nodes[0])
@@ -96,14 +237,14 @@ class ParserFunctionsTest(unittest.TestCase):
         )
         self.assertEqual(pyparam, exp_param)
 
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template6.py")
+        source_code = self._template_sources["template6.py"]
         pyparam_parser.source_to_yaml_config(source_code, self.config_tmp_path)
-        config = pyparam_parser.read_yaml_file(Path(self.config_tmp_path))
+        config = pyparam_parser.read_yaml_file(self.config_tmp_path)
 
         pyparam_parser.compile_source_code(source_code, config, validate_version=False)
 
     def test_get_all_pyparams_from_source_code(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template1.py")
+        source_code = self._template_sources["template1.py"]
         pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
 
         exp_params = [
@@ -119,90 +260,72 @@ class ParserFunctionsTest(unittest.TestCase):
         self.assertEqual(pyparams, exp_params)
 
     def test_to_yaml(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template3.py")
+        source_code = self._template_sources["template3.py"]
         pyparam_parser.source_to_yaml_config(source_code, self.config_tmp_path)
 
+    def test_fast_yaml_dump(self):
+        config = OrderedDict(
+            model=OrderedDict(
+                layers={"dtype": "list", "value": [1, 2.5e-05, True, None]},
+                activation={
+                    "desc": " ".join(["Activation of the hidden layers."] * 4),
+                    "dtype": "str",
+                    "value": "relu",
+                },
+            )
+        )
+        yaml_stream, fast_stream = io.StringIO(), io.StringIO()
+        pyparam_parser.pyparams_ordered_yaml_dump(
+            config, stream=yaml_stream, width=60, default_flow_style=False
+        )
+        pyparam_parser.pyparams_ordered_yaml_dump(
+            config, stream=fast_stream, fast=True, width=60, default_flow_style=False
+        )
+        self.assertEqual(yaml_stream.getvalue(), fast_stream.getvalue())
+
+        # quoted strings are not supported by the fast writer
+        config["model"]["activation"]["value"] = "yes"
+        self.assertIsNone(pyparam_parser._fast_yaml_dump(config, width=60))
+
+        # long keys are written as complex keys by the yaml emitter
+        long_key_config = OrderedDict([("k" * 123, {"dtype": "int", "value": 1})])
+        self.assertIsNone(pyparam_parser._fast_yaml_dump(long_key_config, width=60))
+        yaml_stream, fast_stream = io.StringIO(), io.StringIO()
+        pyparam_parser.pyparams_ordered_yaml_dump(
+            long_key_config, stream=yaml_stream, width=60, default_flow_style=False
+        )
+        pyparam_parser.pyparams_ordered_yaml_dump(
+            long_key_config, stream=fast_stream, fast=True, width=60, default_flow_style=False
+        )
+        self.assertEqual(yaml_stream.getvalue(), fast_stream.getvalue())
+
     def test_loading_yaml(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template3.py")
+        source_code = self._template_sources["template3.py"]
         pyparam_parser.source_to_yaml_config(source_code, self.config_tmp_path)
 
         config = pyparam_parser.read_yaml_file(Path(self.config_tmp_path))
         params = pyparam_parser.read_params_from_config(config)
-
-        exp_params = [
-            NamedPyParam(
-                name="version",
-                param=PyParam(value="1.0", dtype=str, scope="", desc="model version"),
-            ),
-            NamedPyParam(
-                name="base_num_filters",
-                param=PyParam(value=4, dtype=int, scope="feature_extractor", desc=""),
-            ),
-            NamedPyParam(
-                name="include_root",
-                param=PyParam(
-                    value=False, dtype=bool, scope="feature_extractor", desc=""
-                ),
-            ),
-            NamedPyParam(
-                name="regularize_depthwise",
-                param=PyParam(
-                    value=False, dtype=bool, scope="feature_extractor", desc=""
-                ),
-            ),
-            NamedPyParam(
-                name="activation_fn_in_separable_conv",
-                param=PyParam(
-                    value=False, dtype=bool, scope="feature_extractor", desc=""
-                ),
-            ),
-            NamedPyParam(
-                name="entry_flow_blocks",
-                param=PyParam(
-                    value=(1, 1, 1),
-                    dtype=tuple,
-                    scope="feature_extractor",
-                    desc="Number of units in each bock in the entry flow.",
-                ),
-            ),
-            NamedPyParam(
-                name="middle_flow_blocks",
-                param=PyParam(
-                    value=(1,),
-                    dtype=tuple,
-                    scope="feature_extractor",
-                    desc="Number of units in the middle flow.",
-                ),
-            ),
-
-
-        ]
-
-        self.assertEqual(params, exp_params)
+        self.assertEqual(params, EXPECTED_TEMPLATE3_PARAMS)
 
     def test_source_code_compilation(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template3.py")
+        source_code = self._template_sources["template3.py"]
         pyparam_parser.source_to_yaml_config(source_code, self.config_tmp_path)
-        config = pyparam_parser.read_yaml_file(Path(self.config_tmp_path))
+        config = pyparam_parser.read_yaml_file(self.config_tmp_path)
 
         new_source_code = pyparam_parser.compile_source_code(
             source_code=source_code, config=config
         )
-
-        with open(self.source_code_tmp_path, "w") as file:
-            file.write(new_source_code)
+        # compiled source must be a valid python code
+        ast.parse(new_source_code)
 
     def test_version_check(self):
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template3.py")
-        config = pyparam_parser.read_yaml_file(self.sample_path / "template3_config.yml")
+        source_code = self._template_sources["template3.py"]
+        config = copy.deepcopy(self._template3_config)
 
-        new_source_code = pyparam_parser.compile_source_code(
+        pyparam_parser.compile_source_code(
             source_code=source_code, config=config, validate_version=True
         )
 
-        with open(self.source_code_tmp_path, "w") as file:
-            file.write(new_source_code)
-
         with self.assertRaises(ValueError):
             del config["version"]
             pyparam_parser.compile_source_code(
@@ -218,7 +341,7 @@ class ParserFunctionsTest(unittest.TestCase):
             )
 
     def test_get_param(self):
-        config = pyparam_parser.read_yaml_file(self.sample_path / "template3_config.yml")
+        config = copy.deepcopy(self._template3_config)
         params_list = pyparam_parser.read_params_from_config(config)
         selected_param = pyparam_parser.get_param("feature_extractor/include_root", params_list)
         param = selected_param.param_replace(value=True)
@@ -230,7 +353,7 @@ class ParserFunctionsTest(unittest.TestCase):
         self.assertEqual(param, exp_param)
 
     def test_replace_param(self):
-        config = pyparam_parser.read_yaml_file(self.sample_path / "template3_config.yml")
+        config = copy.deepcopy(self._template3_config)
         config_params = pyparam_parser.read_params_from_config(config)
 
         param1 = pyparam_parser.get_param(
@@ -244,65 +367,17 @@ class ParserFunctionsTest(unittest.TestCase):
         config_params = pyparam_parser.replace_param(param=param1, config_params=config_params)
         config_params = pyparam_parser.replace_param(param=param2, config_params=config_params)
 
-        save_file_path = Path(f"{self.tmp_dir}/config.yaml")
+        save_file_path = Path(self.tmp_dir) / f"{self._testMethodName}_config.yaml"
         pyparam_parser.params_to_yaml_config(
             config_params=config_params, save_file_path=save_file_path
         )
 
         config = pyparam_parser.read_yaml_file(save_file_path)
         params = pyparam_parser.read_params_from_config(config)
-
-        exp_params = [
-            NamedPyParam(
-                name="activation_fn_in_separable_conv",
-                param=PyParam(
-                    value=False, dtype=bool, scope="feature_extractor", desc=""
-                ),
-            ),
-            NamedPyParam(
-                name="base_num_filters",
-                param=PyParam(value=4, dtype=int, scope="feature_extractor", desc=""),
-            ),
-            NamedPyParam(
-                name="entry_flow_blocks",
-                param=PyParam(
-                    value=(1, 1),
-                    dtype=tuple,
-                    scope="feature_extractor",
-                    desc="Number of units in each bock in the entry flow.",
-                ),
-            ),
-            NamedPyParam(
-                name="include_root",
-                param=PyParam(
-                    value=True, dtype=bool, scope="feature_extractor", desc=""
-                ),
-            ),
-            NamedPyParam(
-                name="middle_flow_blocks",
-                param=PyParam(
-                    value=(1,),
-                    dtype=tuple,
-                    scope="feature_extractor",
-                    desc="Number of units in the middle flow.",
-                ),
-            ),
-            NamedPyParam(
-                name="regularize_depthwise",
-                param=PyParam(
-                    value=False, dtype=bool, scope="feature_extractor", desc=""
-                ),
-            ),
-            NamedPyParam(
-                name="version",
-                param=PyParam(value="1.0", dtype=str, scope="", desc="model version"),
-            ),
-        ]
-
-        self.assertEqual(params, exp_params)
+        self.assertEqual(params, EXPECTED_TEMPLATE3_REPLACED_PARAMS)
 
     def test_replace_configs(self):
-        config = pyparam_parser.read_yaml_file(self.sample_path / "template3_config.yml")
+        config = copy.deepcopy(self._template3_config)
         config_params = pyparam_parser.read_params_from_config(config)
         param1 = pyparam_parser.get_param(
             "feature_extractor/include_root", config_params
@@ -322,9 +397,12 @@ class ParserFunctionsTest(unittest.TestCase):
 
     def test_source_scope_modification(self):
 
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template7.py")
-        pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
-        named_nodes, source_code_module = pyparam_parser.get_source_params_assignments(source_code)
+        source_code = self._template_sources["template7.py"]
+        (
+            pyparams,
+            named_nodes,
+            source_code_module,
+        ) = pyparam_parser.get_source_params_with_assignments(source_code)
         scoped_pyparams = pyparam_parser.add_scope("test", pyparams)
 
         node_to_config_param = {}
@@ -333,16 +411,13 @@ class ParserFunctionsTest(unittest.TestCase):
 
         transformer = pyparam_parser.get_render_as_ast_node_transformer(node_to_config_param)
         new_root_module = transformer.visit(source_code_module)
-        new_source = astor.to_source(
-            new_root_module, indent_with=pyparam_parser.COMPILED_SOURCE_INDENTATION,
-            pretty_source=pyparam_parser.astor_pretty_source_formatter
-        )
+        new_source = pyparam_parser.render_module(new_root_module)
         new_scoped_pyparams = pyparam_parser.get_all_pyparams_from_source_code(new_source)
         self.assertEqual(new_scoped_pyparams, scoped_pyparams)
 
     def test_update_pyparams(self):
 
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template7.py")
+        source_code = self._template_sources["template7.py"]
         pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
 
         scoped_pyparams = pyparam_parser.add_scope("test", pyparams)
@@ -350,9 +425,11 @@ class ParserFunctionsTest(unittest.TestCase):
         new_scoped_pyparams = pyparam_parser.get_all_pyparams_from_source_code(new_source)
         self.assertEqual(new_scoped_pyparams, scoped_pyparams)
 
-    def test_save_and_load_check_descriptions(self):
-
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template7.py")
+    def _check_yaml_roundtrip(self, template_name: str) -> str:
+        """Saves params of the template to yaml config, checks that they are
+        loaded back unchanged and returns the template compiled with the config.
+        """
+        source_code = self._template_sources[template_name]
         pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
         pyparam_parser.source_to_yaml_config(source_code, self.config_tmp_path)
 
@@ -360,25 +437,58 @@ class ParserFunctionsTest(unittest.TestCase):
         loaded_pyparams = pyparam_parser.read_params_from_config(config)
 
         self.assertEqual(pyparams, loaded_pyparams)
-        pyparam_parser.compile_source_code(source_code, config)
+        return pyparam_parser.compile_source_code(source_code, config)
+
+    def test_save_and_load_check_descriptions(self):
+        self._check_yaml_roundtrip("template7.py")
 
     def test_params_wo_annotations_in_functions_def(self):
+        compiled_source = self._check_yaml_roundtrip("template9.py")
 
-        source_code = pyparam_parser.read_source_code(self.sample_path / "template9.py")
-        pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
-        pyparam_parser.source_to_yaml_config(source_code, self.config_tmp_path)
-        config = pyparam_parser.read_yaml_file(self.config_tmp_path)
-        loaded_pyparams = pyparam_parser.read_params_from_config(config)
+        expected_lines = [
+            "some_function(x, y, param2: int=2, param3: float=3, "
+            "param4: int=4, param5=5, param6=6)",
+            "self, arg1: float=1.1, arg2=2.2",
+            "result = some_function(0, 1, param2=12, param3=13)",
+            "  param2 = 2",
+            "  param3: int = 3",
+            "  def nested_function2(x, y, np2: int=2)",
+        ]
+        missing = [line for line in expected_lines if line not in compiled_source]
+        self.assertEqual(missing, [])
 
-        self.assertEqual(pyparams, loaded_pyparams)
-        compiled_source = pyparam_parser.compile_source_code(source_code, config)
+    def test_compile_none_value(self):
+        source_code = "n: int = PyParam(None, dtype=int)\n"
+        pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
+        compiled_source = pyparam_parser.compile_source_code_from_configs_list(
+            source_code, pyparams
+        )
+        self.assertTrue("n: int = None" in compiled_source)
 
-        self.assertTrue(
-            "some_function(x, y, param2: int=2, param3: float=3, "
-            "param4: int=4, param5=5, param6=6)" in compiled_source
+    def test_compile_keeps_regular_function_defaults(self):
+        source_code = "def fun(a, b=3, c=PyParam(4, dtype=int)):\n    return a\n"
+        pyparams = pyparam_parser.get_all_pyparams_from_source_code(source_code)
+        compiled_source = pyparam_parser.compile_source_code_from_configs_list(
+            source_code, pyparams
+        )
+        self.assertTrue("def fun(a, b=3, c=4):" in compiled_source)
+
+    def test_named_pyparam_pickle_across_hash_seeds(self):
+        # pickle in a process with a different hash seed, the hash cached there
+        # must not be reused after loading
+        script = (
+            "import pickle, sys\n"
+            "from pyparams.pyparam import PyParam, NamedPyParam\n"
+            "param = NamedPyParam('name', PyParam('value', scope='scope'))\n"
+            "hash(param)\n"
+            "sys.stdout.buffer.write(pickle.dumps(param))\n"
         )
-        self.assertTrue("self, arg1: float=1.1, arg2=2.2" in compiled_source)
-        self.assertTrue("result = some_function(0, 1, param2=12, param3=13)" in compiled_source)
-        self.assertTrue("  param2 = 2" in compiled_source)
-        self.assertTrue("  param3: int = 3" in compiled_source)
-        self.assertTrue("  def nested_function2(x, y, np2: int=2)" in compiled_source)
+        env = dict(os.environ, PYTHONHASHSEED="1", PYTHONPATH=str(get_project_root_path()))
+        data = subprocess.run(
+            [sys.executable, "-c", script], env=env, stdout=subprocess.PIPE, check=True
+        ).stdout
+        loaded = pickle.loads(data)
+        param = NamedPyParam("name", PyParam("value", scope="scope"))
+        self.assertEqual(loaded, param)
+        self.assertEqual(hash(loaded), hash(param))
+        self.assertTrue(loaded in {param})